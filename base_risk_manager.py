@@ -5,74 +5,108 @@ Core functionality for monitoring and managing long option positions
 """
 
 import robin_stocks.robinhood as r
-import datetime
 import time
-from typing import Dict, List, Optional
+import logging
+from typing import Dict, List, Optional, Tuple
 from position_types import LongPosition
 from position_manager import position_manager
+from shared.market_hours import is_market_hours
 
 class BaseRiskManager:
     def __init__(self, stop_loss_percent: float = 50.0, take_profit_percent: float = 50.0, account_number: Optional[str] = None):
         self.stop_loss_percent = stop_loss_percent
         self.take_profit_percent = take_profit_percent
         self.account_number = account_number
-        self.positions: Dict[str, LongPosition] = {}
+        self.positions = {}
+        self._positions_version: Optional[int] = None  # PositionManager version of our copy; None = not from cache
+        self.logger = logging.getLogger('risk_manager.base_risk_manager')  # Child of the main logger: shares its handlers
         
-        print("Base Risk Manager for Long Options")
-        print(f"Stop Loss: -{self.stop_loss_percent}%")
-        print(f"Take Profit: {self.take_profit_percent}%")
-        print("=" * 50)
+        self.logger.info(f"Base Risk Manager for Long Options - Stop Loss: -{self.stop_loss_percent}%, Take Profit: {self.take_profit_percent}%")
+    
+    @property
+    def positions(self) -> Dict[str, LongPosition]:
+        self._sync_positions()
+        return self._positions
+    
+    @positions.setter
+    def positions(self, positions: Dict[str, LongPosition]) -> None:
+        self._positions = positions
+        self._positions_order: List[str] = list(positions)  # Keys in display order, for index lookups
+    
+    def _sync_positions(self) -> None:
+        """Re-copy the cached positions if PositionManager reloaded the account since our copy.
+        The monitor refreshes prices on PositionManager's objects, so a stale copy would stop updating.
+        """
+        if self._positions_version is None or not self.account_number:
+            return
+        if position_manager.get_positions_version(self.account_number) != self._positions_version:
+            self._positions_version, self.positions = position_manager.get_positions_snapshot(self.account_number)
+    
+    def _add_position(self, position_key: str, position: LongPosition) -> None:
+        """Insert a position, keeping the index order in sync"""
+        if position_key not in self._positions:
+            self._positions_order.append(position_key)
+        self._positions[position_key] = position
+    
+    def position_at(self, idx: int) -> Tuple[Optional[str], Optional[LongPosition]]:
+        """Return (position_key, position) at a display index, or (None, None) if out of range"""
+        self._sync_positions()
+        if 0 <= idx < len(self._positions_order):
+            position_key = self._positions_order[idx]
+            return position_key, self._positions.get(position_key)
+        return None, None
     
     def login_robinhood(self) -> bool:
         """Login to Robinhood"""
         try:
-            print("Authenticating with Robinhood...")
-            print("Starting login process...")
+            self.logger.info("Authenticating with Robinhood...")
             
             # Try existing login first
             r.login()
-            print("Authentication successful!")
+            self.logger.info("Authentication successful!")
             return True
             
         except Exception as e:
-            print(f"Authentication failed: {e}")
+            self.logger.error(f"Authentication failed: {e}")
             return False
     
     def load_long_positions(self) -> int:
         """Load long positions using cached data from PositionManager"""
         try:
             account_display = f" for account ...{self.account_number[-4:]}" if self.account_number else ""
-            print(f"Loading cached positions{account_display}...")
+            self.logger.info(f"Loading cached positions{account_display}...")
             
             # Get positions from PositionManager cache (already loaded by AccountDetector)
-            cached_positions = position_manager.get_positions_for_account(self.account_number)
+            version, cached_positions = position_manager.get_positions_snapshot(self.account_number)
+            self._positions_version = version
             
             if not cached_positions:
-                print("No open positions found")
+                self.logger.info("No open positions found")
                 return 0
             
             # Copy cached positions to local storage (preserve existing interface)
-            self.positions = cached_positions.copy()
+            self.positions = cached_positions
             loaded_count = len(self.positions)
             
-            print(f"Loaded {loaded_count} cached positions{account_display}")
+            self.logger.info(f"Loaded {loaded_count} cached positions{account_display}")
             return loaded_count
             
         except Exception as e:
-            print(f"Error loading positions: {e}")
+            self.logger.error(f"Error loading positions: {e}")
             return 0
             
     def load_long_positions_original(self) -> int:
         """FALLBACK: Original position loading method (kept for safety)"""
         try:
             account_display = f" for account ...{self.account_number[-4:]}" if self.account_number else ""
-            print(f"Fetching positions from Robinhood{account_display} (FALLBACK)...")
+            self.logger.info(f"Fetching positions from Robinhood{account_display} (FALLBACK)...")
             
             # Get open option positions for this specific account
             positions = r.get_open_option_positions(account_number=self.account_number)
+            self._positions_version = None  # Our own objects now; don't resync from the cache
             
             if not positions:
-                print("No open positions found")
+                self.logger.info("No open positions found")
                 return 0
             
             loaded_count = 0
@@ -90,7 +124,7 @@ class BaseRiskManager:
                     option_id = position.get('option_id')
                     
                     if not instrument_url and not option_id:
-                        print(f"No instrument URL or option_id found")
+                        self.logger.warning("No instrument URL or option_id found")
                         continue
                     
                     # Extract option_id from URL if we don't have it directly
@@ -152,25 +186,25 @@ class BaseRiskManager:
                     # Calculate P&L
                     self.calculate_pnl(long_position)
                     
-                    self.positions[position_key] = long_position
-                    print(f"  {symbol} {strike_price}{option_type.upper()} {expiration_date} - Paid: ${total_cost:.2f}")
+                    self._add_position(position_key, long_position)
+                    self.logger.debug(f"  {symbol} {strike_price}{option_type.upper()} {expiration_date} - Paid: ${total_cost:.2f}")
                     
                     loaded_count += 1
                     
                 except Exception as e:
-                    print(f"Error processing position: {e}")
+                    self.logger.error(f"Error processing position: {e}")
                     continue
             
-            print(f"Loaded {loaded_count} long positions from Robinhood:")
+            self.logger.info(f"Loaded {loaded_count} long positions from Robinhood")
             return loaded_count
             
         except Exception as e:
-            print(f"Error loading positions: {e}")
+            self.logger.error(f"Error loading positions: {e}")
             return 0
     
-    def calculate_pnl(self, position: LongPosition) -> None:
+    def calculate_pnl(self, position: LongPosition, max_age: float = 0.0) -> None:
         """Delegate P&L calculation to PositionManager"""
-        position_manager.calculate_pnl(position)
+        position_manager.calculate_pnl(position, max_age)
     
     def _update_current_price(self, position: LongPosition) -> None:
         """Deprecated: PositionManager handles price updates"""
@@ -181,12 +215,18 @@ class BaseRiskManager:
         if self.account_number:
             position_manager.refresh_prices(self.account_number)
     
+    def total_pnl(self) -> float:
+        """Account P&L aggregated by the last price refresh"""
+        return position_manager.get_total_pnl(self.account_number)
+    
     def check_trailing_stops(self) -> None:
         """Update prices and evaluate trailing stops via PositionManager"""
         if not self.account_number:
             return
         if self.is_market_hours():
             position_manager.refresh_prices(self.account_number)
+            if not position_manager.has_enabled_trailing_stops(self.account_number):
+                return
             try:
                 position_manager.check_trailing_stops(self.account_number)
             except Exception:
@@ -194,22 +234,7 @@ class BaseRiskManager:
     
     def is_market_hours(self) -> bool:
         """Check if market is currently open"""
-        from datetime import datetime
-        import pytz
-        
-        # Get current Eastern time directly
-        et = pytz.timezone('America/New_York')
-        now = datetime.now(et)
-        
-        # Check if weekday
-        if now.weekday() >= 5:  # Saturday=5, Sunday=6
-            return False
-        
-        # Market hours: 9:30 AM to 4:00 PM ET
-        market_open = now.replace(hour=9, minute=30, second=0, microsecond=0)
-        market_close = now.replace(hour=16, minute=0, second=0, microsecond=0)
-        
-        return market_open <= now <= market_close
+        return is_market_hours()
     
     def should_close_position(self, position: LongPosition) -> tuple[bool, str]:
         """Check if a position should be closed based on risk rules"""
@@ -11,8 +11,10 @@ import threading
 import time
 import logging
 from typing import Dict, Optional
-from datetime import datetime
-import pytz
+from shared.market_hours import is_market_hours
+
+# Seconds between off-hours loop passes; prices are only refreshed if the dashboard was polled meanwhile
+OFF_HOURS_INTERVAL = 60.0
 
 class AccountMonitoringThread:
     """Handles monitoring for a single account"""
@@ -26,7 +28,9 @@ class AccountMonitoringThread:
         )
         self.thread = None
         self.stop_event = threading.Event()
+        self.wake_event = threading.Event()  # Cuts the current wait short (stop, trail enabled)
         self.initial_loading_complete = False
+        self.last_viewed = float('-inf')  # Monotonic time of the last dashboard positions poll
         self.logger = logging.getLogger(f'account_monitor_{account_number[-4:]}')
         
     def start_monitoring(self):
@@ -45,13 +49,24 @@ class AccountMonitoringThread:
         """Stop the monitoring thread"""
         if self.thread and self.thread.is_alive():
             self.stop_event.set()
+            self.wake_event.set()
             self.thread.join(timeout=5)
             self.logger.info(f"Stopped monitoring for account {self.account_info['display_name']}")
     
+    def wake(self):
+        """Run the next monitoring tick now instead of at the end of the current wait"""
+        self.wake_event.set()
+    
+    def note_viewed(self):
+        """Record a dashboard poll; wakes an idle off-hours loop so the first view gets fresh prices"""
+        now = time.monotonic()
+        idle = now - self.last_viewed >= OFF_HOURS_INTERVAL
+        self.last_viewed = now
+        if idle:
+            self.wake()
+    
     def monitoring_loop(self):
         """Main monitoring loop - runs independently per account"""
-        et_tz = pytz.timezone('US/Eastern')
-        
         # Load positions once at start of monitoring (auth already done globally)
         self.logger.info(f"Loading positions for account {self.account_info['display_name']}")
         position_count = self.risk_manager.load_long_positions()
@@ -65,37 +80,40 @@ class AccountMonitoringThread:
             
         self.logger.info(f"Monitoring {position_count} positions for account {self.account_info['display_name']}")
         
+        next_tick = time.monotonic()  # Deadline for the next market-hours tick
         while not self.stop_event.is_set():
+            self.wake_event.clear()
             try:
-                now_et = datetime.now(et_tz)
-                current_time = now_et.time()
-                
-                # Market hours: 9:30 AM - 4:00 PM ET
-                market_start = current_time.replace(hour=9, minute=30, second=0)
-                market_end = current_time.replace(hour=16, minute=0, second=0)
-                is_market_hours = market_start <= current_time <= market_end
-                is_weekday = now_et.weekday() < 5  # Monday = 0, Sunday = 6
-                
-                if is_market_hours and is_weekday:
+                if is_market_hours():
                     # High frequency updates during market hours only
                     self.risk_manager.check_trailing_stops()
-                    time.sleep(1)  # 1-second updates during market hours
+                    # 1-second cadence measured from the previous deadline, so the
+                    # time spent fetching prices does not stretch the interval
+                    next_tick += 1.0
+                    now = time.monotonic()
+                    if next_tick < now:
+                        next_tick = now  # Tick overran; resync rather than burst to catch up
+                    if self.wake_event.wait(next_tick - now):
+                        next_tick = time.monotonic()  # Woken early; restart the cadence from here
                 else:
-                    # Just check every minute if market has opened yet
-                    time.sleep(60)  # 1-minute check when market is closed
+                    # Options don't trade after hours; only refresh quotes while someone is watching
+                    if time.monotonic() - self.last_viewed < OFF_HOURS_INTERVAL:
+                        self.risk_manager.update_position_prices()
+                    self.wake_event.wait(OFF_HOURS_INTERVAL)  # 1-minute check when market is closed
+                    next_tick = time.monotonic()
                     
             except Exception as e:
                 self.logger.error(f"Error in monitoring loop for account {self.account_number[-4:]}: {e}")
-                time.sleep(5)  # Brief pause on error
+                self.stop_event.wait(5)  # Brief pause on error
 
 class MultiAccountRiskManager:
     """Manages multiple isolated risk manager instances"""
     
     def __init__(self):
-        self.logger = logging.getLogger('multi_account_manager')
+        self.logger = logging.getLogger('risk_manager.multi_account_manager')  # Child of the main logger: shares its handlers
         self.account_detector = AccountDetector()
         self.monitoring_threads: Dict[str, AccountMonitoringThread] = {}
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()
     
     def initialize_accounts(self, force_refresh: bool = False) -> Dict[str, Dict]:
         """Initialize and detect all available accounts"""
@@ -131,6 +149,25 @@ class MultiAccountRiskManager:
             self.logger.info(f"Started monitoring for {account_info['display_name']}")
             return True
     
+    def ensure_account_monitoring(self, account_number: str, stop_loss_percent: float = 50.0) -> Optional[BaseRiskManager]:
+        """Start monitoring unless already running; check and start happen under one lock"""
+        with self._lock:
+            if account_number not in self.monitoring_threads:
+                self.start_account_monitoring(account_number, stop_loss_percent)
+            return self.get_account_risk_manager(account_number)
+    
+    def note_dashboard_poll(self, account_number: str):
+        """Tell an account's monitor the dashboard is open (drives off-hours price refreshes)"""
+        monitor = self.monitoring_threads.get(account_number)
+        if monitor:
+            monitor.note_viewed()
+    
+    def wake_account_monitoring(self, account_number: str):
+        """Ask an account's monitor to tick immediately (e.g. after a trailing stop is enabled)"""
+        monitor = self.monitoring_threads.get(account_number)
+        if monitor:
+            monitor.wake()
+    
     def stop_account_monitoring(self, account_number: str):
         """Stop monitoring for a specific account"""
         with self._lock:
@@ -152,13 +189,10 @@ class MultiAccountRiskManager:
     
     def wait_for_initial_loading(self, timeout_seconds: int = 30):
         """Wait for all monitoring threads to complete their initial data loading"""
-        import time
-        
         self.logger.info("Waiting for all accounts to complete initial data loading...")
-        print("Waiting for all accounts to complete initial data loading...")
         
-        start_time = time.time()
-        while time.time() - start_time < timeout_seconds:
+        start_time = time.monotonic()  # Immune to wall-clock jumps
+        while time.monotonic() - start_time < timeout_seconds:
             all_loaded = True
             for account_number, monitor in self.monitoring_threads.items():
                 if not monitor.initial_loading_complete:
@@ -167,13 +201,11 @@ class MultiAccountRiskManager:
             
             if all_loaded:
                 self.logger.info("All accounts completed initial data loading")
-                print("✅ All accounts completed initial data loading")
                 return True
             
             time.sleep(0.5)  # Check every 500ms
         
         self.logger.warning(f"Timeout waiting for initial loading after {timeout_seconds}s")
-        print(f"⚠️  Timeout waiting for initial loading after {timeout_seconds}s")
         return False
     
     def stop_all_monitoring(self):
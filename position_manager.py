@@ -5,11 +5,26 @@ Centralized position data management and trading logic
 """
 
 import robin_stocks.robinhood as r
-import datetime
 import threading
 import logging
-from typing import Dict, Optional, List
-from position_types import LongPosition
+import json
+import os
+import time
+from typing import Dict, Optional, List, Tuple
+from position_types import LongPosition, TrailStopData, TAKE_PROFIT_DEFAULTS
+
+# Robinhood order states that never change again; these are not re-polled
+TERMINAL_ORDER_STATES = frozenset({'filled', 'cancelled', 'canceled', 'rejected', 'failed'})
+# Upper bound (seconds) for the exponential backoff between status polls
+MAX_ORDER_POLL_INTERVAL = 30.0
+# Settled orders kept per account for display; oldest are dropped beyond this
+MAX_ARCHIVED_ORDERS = 200
+# A close order for the same position within this many seconds is treated as a duplicate
+DUPLICATE_CLOSE_WINDOW = 10.0
+# Quotes younger than this (seconds) are reused by configuration calls; matches the monitor cadence
+PRICE_MAX_AGE = 1.0
+# Tracked-order fields written to the orders file; full Robinhood details are re-polled instead
+PERSISTED_ORDER_FIELDS = ('symbol', 'position_key', 'quantity', 'price', 'submit_time_ns', 'order_type', 'state')
 
 class PositionManager:
     """Centralized position management for multi-account system"""
@@ -20,9 +35,21 @@ class PositionManager:
         self._lock = threading.RLock()  # Basic thread safety
         self.logger = logging.getLogger('position_manager')
         # Track submitted orders per account
-        # {account_number: {order_id: {symbol, quantity, price, submit_time, order_type}}}
+        # {account_number: {order_id: {symbol, quantity, price, submit_time_ns, order_type}}}
         self._tracked_orders: Dict[str, Dict[str, Dict]] = {}
+        # Orders that reached a terminal state, moved out of the active set
+        self._archived_orders: Dict[str, Dict[str, Dict]] = {}
+        # Positions with an enabled trailing stop: {account_number: {position_key: position}}
+        self._enabled_trails: Dict[str, Dict[str, LongPosition]] = {}
+        # First position key per symbol: {account_number: {symbol: position_key}}
+        self._symbol_index: Dict[str, Dict[str, str]] = {}
+        # Bumped on every reload so copies of an account's map can tell they are stale
+        self._positions_version: Dict[str, int] = {}
+        # Aggregate P&L per account, maintained by refresh_prices
+        self._total_pnl: Dict[str, float] = {}
         self._order_service = None
+        # JSON file mirroring tracked/archived orders across restarts (None = memory only)
+        self._orders_path: Optional[str] = None
 
     def set_order_service(self, order_service) -> None:
         """Inject the order service dependency (live-only)."""
@@ -40,7 +67,7 @@ class PositionManager:
                 
                 if not positions:
                     self.logger.info(f"No positions found for account {account_display}")
-                    self._positions[account_number] = {}
+                    self._store_positions(account_number, {})
                     return 0
                 
                 # Process positions (same logic as BaseRiskManager)
@@ -106,58 +133,164 @@ class PositionManager:
                         continue
                 
                 # Store positions for this account
-                self._positions[account_number] = account_positions
+                self._store_positions(account_number, account_positions)
                 self.logger.info(f"Loaded {loaded_count} positions for account {account_display}")
                 return loaded_count
                 
             except Exception as e:
                 self.logger.error(f"Error loading positions for account {account_number}: {e}")
-                self._positions[account_number] = {}
+                self._store_positions(account_number, {})
                 return 0
     
+    def _store_positions(self, account_number: str, account_positions: Dict[str, LongPosition]) -> None:
+        """Replace an account's positions and reset indexes derived from them"""
+        self._positions[account_number] = account_positions
+        self._positions_version[account_number] = self._positions_version.get(account_number, 0) + 1
+        self._enabled_trails[account_number] = {}
+        symbol_index = {}
+        for position_key, position in account_positions.items():
+            symbol_index.setdefault(position.symbol, position_key)  # Keep the first match, as the scan did
+        self._symbol_index[account_number] = symbol_index
+    
     def get_positions_for_account(self, account_number: str) -> Dict[str, LongPosition]:
         """Get cached positions for a specific account"""
         with self._lock:
             return self._positions.get(account_number, {}).copy()
     
+    def get_positions_snapshot(self, account_number: str) -> Tuple[int, Dict[str, LongPosition]]:
+        """Get (version, copy of positions) for an account, read together under the lock"""
+        with self._lock:
+            return self._positions_version.get(account_number, 0), self._positions.get(account_number, {}).copy()
+    
+    def get_positions_version(self, account_number: str) -> int:
+        """Reload counter for an account's positions (see get_positions_snapshot)"""
+        return self._positions_version.get(account_number, 0)
+    
     def get_position(self, account_number: str, symbol: str) -> Optional[LongPosition]:
         """Get a specific position by symbol"""
+        return self._find_position(account_number, symbol)[1]
+    
+    def _find_position(self, account_number: str, symbol: str):
+        """Return (position_key, position) for the first position matching symbol, or (None, None)"""
         with self._lock:
             account_positions = self._positions.get(account_number, {})
-            for position_key, position in account_positions.items():
-                if position.symbol == symbol:
-                    return position
-            return None
+            position_key = self._symbol_index.get(account_number, {}).get(symbol)
+            position = account_positions.get(position_key)
+            if position is None:
+                return None, None
+            return position_key, position
     
     def refresh_prices(self, account_number: str) -> None:
-        """Update current prices for all positions in an account"""
+        """Update current prices for all positions in an account and re-aggregate total P&L"""
         with self._lock:
-            account_positions = self._positions.get(account_number, {})
-            for position in account_positions.values():
-                self.calculate_pnl(position)
+            positions = list(self._positions.get(account_number, {}).values())
+        # Quotes are fetched without the lock, which every account and request shares
+        quotes = [(position, self._fetch_mark_price(position)) for position in positions]
+        with self._lock:
+            total_pnl = 0.0
+            for position, price in quotes:
+                self._apply_price(position, price)
+                total_pnl += position.pnl
+            self._total_pnl[account_number] = total_pnl
+
+    def get_total_pnl(self, account_number: str) -> float:
+        """Total P&L for an account as of the last refresh_prices"""
+        with self._lock:
+            return self._total_pnl.get(account_number, 0.0)
+
+    # -------------------- Order persistence --------------------
+    def enable_order_persistence(self, path: str) -> int:
+        """Mirror tracked orders to `path` and restore any saved there; returns orders restored"""
+        with self._lock:
+            self._orders_path = path
+            try:
+                with open(path) as f:
+                    saved = json.load(f)
+            except FileNotFoundError:
+                return 0
+            except (OSError, ValueError) as e:
+                self.logger.error(f"Could not restore tracked orders from {path}: {e}")
+                return 0
+            restored = 0
+            for account_number, orders in saved.get('tracked', {}).items():
+                for entry in orders.values():
+                    # Poll timestamps are monotonic and meaningless after a restart; re-check now
+                    entry['next_check_at'] = 0.0
+                    entry['consecutive_checks'] = 0
+                self._tracked_orders.setdefault(account_number, {}).update(orders)
+                restored += len(orders)
+            for account_number, orders in saved.get('archived', {}).items():
+                self._archived_orders.setdefault(account_number, {}).update(orders)
+            self.logger.info(f"Restored {restored} tracked order(s) from {path}")
+            return restored
+
+    @staticmethod
+    def _compact_orders(store: Dict[str, Dict[str, Dict]]) -> Dict[str, Dict[str, Dict]]:
+        """Reduce {account: {order_id: entry}} to the fields a restart needs"""
+        return {
+            account_number: {
+                order_id: {field: entry[field] for field in PERSISTED_ORDER_FIELDS if field in entry}
+                for order_id, entry in orders.items()
+            }
+            for account_number, orders in store.items()
+        }
+
+    def _persist_orders(self) -> None:
+        """Write tracked/archived orders to disk (caller holds the lock)"""
+        if not self._orders_path:
+            return
+        tmp_path = f"{self._orders_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'tracked': self._compact_orders(self._tracked_orders),
+                           'archived': self._compact_orders(self._archived_orders)}, f)
+            os.replace(tmp_path, self._orders_path)  # Atomic swap so a crash never leaves half a file
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.error(f"Could not persist tracked orders to {self._orders_path}: {e}")
 
     # -------------------- Order orchestration --------------------
     def _ensure_order_store(self, account_number: str) -> None:
         if account_number not in self._tracked_orders:
             self._tracked_orders[account_number] = {}
 
+    def _track_order(self, account_number: str, order_id: str, position: LongPosition, price: float,
+                     order_type: str, submit_time_ns: int, position_key: Optional[str] = None) -> None:
+        """Record a submitted order, fully tagged, in one write. Caller holds self._lock."""
+        self._tracked_orders[account_number][order_id] = {
+            'symbol': position.symbol,
+            'position_key': position_key,
+            'quantity': position.quantity,
+            'price': price,
+            'submit_time_ns': submit_time_ns,
+            'order_type': order_type
+        }
+
     def submit_close_order(self, account_number: str, position: LongPosition, limit_price: float) -> Dict[str, any]:
         """Submit a close order via order service and track it."""
+        return self.submit_close_orders(account_number, [position], [limit_price])[0]
+
+    def submit_close_orders(self, account_number: str, positions: List[LongPosition], limit_prices: List[float],
+                            position_keys: Optional[List[str]] = None) -> List[Dict[str, any]]:
+        """Submit close orders for several positions concurrently and track the successful ones.
+        Results are returned in input order. position_keys, when given, are stored on the
+        tracked orders so recent_close_order can detect repeat submissions.
+        """
         if not self._order_service:
-            return {'success': False, 'error': 'Order service not configured'}
-        result = self._order_service.submit_close(position, limit_price)
-        if result.get('success') and result.get('order_id'):
+            return [{'success': False, 'error': 'Order service not configured'} for _ in positions]
+        if position_keys is None:
+            position_keys = [None] * len(positions)
+        results = self._order_service.submit_close_batch(positions, limit_prices)
+        submitted = [(p, lp, key, res) for p, lp, key, res in zip(positions, limit_prices, position_keys, results)
+                     if res.get('success') and res.get('order_id')]
+        if submitted:
             with self._lock:
                 self._ensure_order_store(account_number)
-                order_id = result['order_id']
-                self._tracked_orders[account_number][order_id] = {
-                    'symbol': position.symbol,
-                    'quantity': position.quantity,
-                    'price': limit_price,
-                    'submit_time': datetime.datetime.now().timestamp(),
-                    'order_type': 'limit'
-                }
-        return result
+                submit_time_ns = time.time_ns()
+                for position, limit_price, position_key, result in submitted:
+                    self._track_order(account_number, result['order_id'], position, limit_price, 'limit',
+                                      submit_time_ns, position_key)
+                self._persist_orders()  # One write for the whole batch
+        return results
 
     def submit_trailing_stop(self, account_number: str, position: LongPosition, limit_price: float, stop_price: float) -> Dict[str, any]:
         """Submit a trailing stop as stop-limit; mark position state and track order."""
@@ -167,20 +300,13 @@ class PositionManager:
         if result.get('success') and result.get('order_id'):
             with self._lock:
                 # Update position trail stop state
-                if not hasattr(position, 'trail_stop_data'):
-                    position.trail_stop_data = {}
-                position.trail_stop_data['order_id'] = result['order_id']
-                position.trail_stop_data['order_submitted'] = True
+                position.trail_stop_data.order_id = result['order_id']
+                position.trail_stop_data.order_submitted = True
                 # Track order
                 self._ensure_order_store(account_number)
-                order_id = result['order_id']
-                self._tracked_orders[account_number][order_id] = {
-                    'symbol': position.symbol,
-                    'quantity': position.quantity,
-                    'price': limit_price,
-                    'submit_time': datetime.datetime.now().timestamp(),
-                    'order_type': 'stop_limit'
-                }
+                self._track_order(account_number, result['order_id'], position, limit_price, 'stop_limit',
+                                  time.time_ns())
+                self._persist_orders()
         return result
 
     def cancel_order(self, account_number: str, order_id: str) -> Dict[str, any]:
@@ -189,16 +315,96 @@ class PositionManager:
         result = self._order_service.cancel_order(order_id)
         if result.get('success'):
             with self._lock:
-                # Keep it in tracked orders; status refresh endpoint will reflect cancellation
-                if account_number not in self._tracked_orders:
-                    self._tracked_orders[account_number] = {}
+                # Only polling fields change; the persisted entry is rewritten once the state does
+                self._mark_cancel_requested(account_number, order_id)
         return result
 
+    def cancel_orders(self, order_ids: List[str]) -> Dict[str, Dict[str, any]]:
+        """Cancel several orders concurrently (any account); returns {order_id: result}."""
+        if not self._order_service:
+            return {order_id: {'success': False, 'error': 'Order service not configured'} for order_id in order_ids}
+        results = self._order_service.cancel_orders(order_ids)
+        with self._lock:
+            for order_id, result in results.items():
+                if result.get('success'):
+                    account_number = self.find_order_account(order_id)
+                    if account_number:
+                        self._mark_cancel_requested(account_number, order_id)
+        return results
+
+    def _mark_cancel_requested(self, account_number: str, order_id: str) -> bool:
+        """Re-poll a tracked order on the next refresh (caller holds the lock); True if tracked"""
+        # Keep it in tracked orders; status refresh endpoint will reflect cancellation
+        entry = self._tracked_orders.get(account_number, {}).get(order_id)
+        if entry is None:
+            return False
+        # State is about to change; poll again on the next refresh
+        entry['cancel_requested'] = True  # No longer blocks a new close for the same position
+        entry['next_check_at'] = 0.0
+        entry['consecutive_checks'] = 0
+        return True
+
     def get_tracked_order_ids(self, account_number: str) -> Dict[str, Dict]:
         """Return tracked orders dict for an account: {order_id: info}."""
         with self._lock:
             return dict(self._tracked_orders.get(account_number, {}))
 
+    def recent_close_order(self, account_number: str, position_key: str,
+                           window: float = DUPLICATE_CLOSE_WINDOW) -> Optional[str]:
+        """Return the id of a working close order for position_key submitted within `window` seconds"""
+        cutoff_ns = time.time_ns() - int(window * 1e9)
+        with self._lock:
+            for order_id, entry in self._tracked_orders.get(account_number, {}).items():
+                if (entry.get('position_key') == position_key and entry.get('order_type') == 'limit'
+                        and not entry.get('cancel_requested')
+                        and entry.get('submit_time_ns', 0) >= cutoff_ns):
+                    return order_id
+            return None
+
+    def find_order_account(self, order_id: str) -> Optional[str]:
+        """Return the account tracking order_id (active or archived), or None"""
+        with self._lock:
+            for store in (self._tracked_orders, self._archived_orders):
+                for account_number, orders in store.items():
+                    if order_id in orders:
+                        return account_number
+            return None
+
+    def get_archived_orders(self, account_number: str) -> Dict[str, Dict]:
+        """Return settled (terminal) orders for an account: {order_id: info}."""
+        with self._lock:
+            return dict(self._archived_orders.get(account_number, {}))
+
+    @staticmethod
+    def order_refresh_due(order_info: Dict, now: float) -> bool:
+        """True if a tracked order should be polled again (monotonic `now`)."""
+        if order_info.get('state') in TERMINAL_ORDER_STATES:
+            return False
+        return order_info.get('next_check_at', 0.0) <= now
+
+    def record_order_status(self, account_number: str, order_id: str, details: Dict, now: float) -> None:
+        """Cache the latest order details and schedule the next poll with exponential backoff."""
+        with self._lock:
+            entry = self._tracked_orders.get(account_number, {}).get(order_id)
+            if entry is None:
+                return
+            previous_state = entry.get('state')
+            entry['details'] = details
+            entry['state'] = details.get('state')
+            if entry['state'] in TERMINAL_ORDER_STATES:
+                # Move out of the active set so refreshes only scan working orders
+                archive = self._archived_orders.setdefault(account_number, {})
+                archive[order_id] = self._tracked_orders[account_number].pop(order_id)
+                while len(archive) > MAX_ARCHIVED_ORDERS:
+                    archive.pop(next(iter(archive)))
+                self._persist_orders()
+                return
+            checks = entry.get('consecutive_checks', 0)
+            entry['consecutive_checks'] = checks + 1
+            entry['next_check_at'] = now + min(MAX_ORDER_POLL_INTERVAL, 2 ** checks)
+            if entry['state'] != previous_state:
+                self._persist_orders()  # Re-polls that see the same state are not written
+
     # -------------------- Helpers --------------------
     def prepare_trailing_stop_order(self, account_number: str, symbol: str) -> Dict[str, any]:
         """Compute trailing stop order prices from current trail_stop_data.
@@ -208,13 +414,13 @@ class PositionManager:
             position = self.get_position(account_number, symbol)
             if not position:
                 return {'success': False, 'error': f'Position {symbol} not found'}
-            trail = getattr(position, 'trail_stop_data', None)
-            if not trail or not trail.get('enabled'):
+            trail = position.trail_stop_data
+            if not trail.enabled:
                 return {'success': False, 'error': 'Trailing stop not enabled'}
-            trigger = float(trail.get('trigger_price', 0.0) or 0.0)
+            trigger = trail.trigger_price
             if trigger <= 0:
                 # Best-effort fallback: derive from current price and percent
-                pct = float(trail.get('percent', 0.0) or 0.0)
+                pct = trail.percent
                 if position.current_price > 0 and pct > 0:
                     trigger = position.current_price * (1 - pct / 100.0)
                 else:
@@ -225,151 +431,185 @@ class PositionManager:
                 'success': True,
                 'limit_price': limit_price,
                 'stop_price': stop_price,
-                'config': trail
+                'config': trail.to_dict()
             }
     
-    def calculate_pnl(self, position: LongPosition) -> None:
-        """Calculate current P&L for a position (aligned with BaseRiskManager)"""
-        try:
-            if not position.option_ids:
-                return
-
-            option_id = position.option_ids[0]
-            market_data = r.get_option_market_data_by_id(option_id)
+    def calculate_pnl(self, position: LongPosition, max_age: float = 0.0) -> None:
+        """Calculate current P&L for a position (aligned with BaseRiskManager).
+        With max_age > 0, a quote fetched within the last max_age seconds is reused.
+        The quote is fetched without holding the lock; only the update takes it.
+        """
+        if not position.option_ids:
+            return
+        if max_age > 0 and time.monotonic() - position.pnl_updated_at < max_age:
+            return
+        price = self._fetch_mark_price(position)
+        with self._lock:
+            self._apply_price(position, price)
 
+    def _fetch_mark_price(self, position: LongPosition) -> Optional[float]:
+        """Fetch the position's adjusted mark price (network call; do not hold the lock)"""
+        if not position.option_ids:
+            return None
+        try:
+            market_data = r.get_option_market_data_by_id(position.option_ids[0])
             if market_data:
                 # Handle list vs dict shapes
                 market_info = market_data[0] if isinstance(market_data, list) and len(market_data) > 0 else market_data
-                new_price = float(market_info.get('adjusted_mark_price', 0))
-                if new_price > 0:
-                    position.current_price = new_price
+                return float(market_info.get('adjusted_mark_price', 0))
+        except Exception as e:
+            self.logger.error(f"Error fetching price for {position.symbol}: {e}")
+        return None
 
-            if position.current_price > 0:
-                current_value = position.current_price * position.quantity * 100
-                position.pnl = current_value - position.open_premium
-                if position.open_premium > 0:
-                    position.pnl_percent = (position.pnl / position.open_premium) * 100
-            else:
-                # Fallback if no current price
-                position.pnl = -position.open_premium
-                position.pnl_percent = -100.0
+    def _apply_price(self, position: LongPosition, new_price: Optional[float]) -> None:
+        """Store a fetched price (if valid) and recompute P&L (caller holds the lock)"""
+        if new_price and new_price > 0:
+            position.current_price = new_price
+            position.pnl_updated_at = time.monotonic()
 
-        except Exception as e:
-            self.logger.error(f"Error calculating P&L for {position.symbol}: {e}")
+        if position.current_price > 0:
+            current_value = position.current_price * position.quantity * 100
+            position.pnl = current_value - position.open_premium
+            if position.open_premium > 0:
+                position.pnl_percent = (position.pnl / position.open_premium) * 100
+        else:
+            # Fallback if no current price
+            position.pnl = -position.open_premium
+            position.pnl_percent = -100.0
     
     def enable_trailing_stop(self, account_number: str, symbol: str, percent: float) -> bool:
         """Enable trailing stop for a position"""
+        position_key, position = self._find_position(account_number, symbol)
+        if not position:
+            return False
+        
+        # Update current price first (the monitor's last quote is fresh enough); fetched outside the lock
+        self.calculate_pnl(position, max_age=PRICE_MAX_AGE)
+        
         with self._lock:
-            position = self.get_position(account_number, symbol)
-            if not position:
-                return False
-            
-            # Update current price first
-            self.calculate_pnl(position)
-            
             if position.current_price <= 0:
                 return False
             
             # Enable trailing stop
-            trail_stop_data = {
-                'enabled': True,
-                'percent': percent,
-                'highest_price': position.current_price,
-                'trigger_price': position.current_price * (1 - percent / 100),
-                'triggered': False,
-                'order_submitted': False,
-                'last_order_id': None
-            }
+            trail_stop_data = TrailStopData(
+                enabled=True,
+                percent=percent,
+                highest_price=position.current_price,
+                trigger_price=position.current_price * (1 - percent / 100)
+            )
             
             # Store trailing stop data on position
-            setattr(position, 'trail_stop_data', trail_stop_data)
+            position.trail_stop_data = trail_stop_data
+            self._enabled_trails.setdefault(account_number, {})[position_key] = position
             
             self.logger.info(f"Enabled trailing stop for {symbol}: {percent}% at ${position.current_price:.3f}")
             return True
     
+    def disable_trailing_stop(self, account_number: str, symbol: str) -> Optional[LongPosition]:
+        """Disable trailing stop for a position; returns the position or None if not found"""
+        with self._lock:
+            position_key, position = self._find_position(account_number, symbol)
+            if not position:
+                return None
+            position.trail_stop_data.enabled = False
+            self._enabled_trails.get(account_number, {}).pop(position_key, None)
+            return position
+    
+    def has_enabled_trailing_stops(self, account_number: str) -> bool:
+        """O(1) check used by monitors to skip trailing-stop evaluation entirely"""
+        return bool(self._enabled_trails.get(account_number))
+    
     def check_trailing_stops(self, account_number: str) -> None:
         """Check and update trailing stops for all positions in account"""
         with self._lock:
-            account_positions = self._positions.get(account_number, {})
+            enabled_positions = self._enabled_trails.get(account_number)
+            if not enabled_positions:
+                return
+            now = time.time()  # One clock read per tick
             
-            for position in account_positions.values():
-                trail = self.update_trailing_stop_state(position)
-                if trail.get('triggered'):
+            for position in enabled_positions.values():
+                trail = position.trail_stop_data
+                was_triggered = trail.triggered
+                self.update_trailing_stop_state(position, now)
+                # Warn on the transition only, not on every tick while triggered
+                if trail.triggered and not was_triggered:
                     self.logger.warning(
-                        f"Trailing stop TRIGGERED for {position.symbol}! Price ${position.current_price:.3f} <= Trigger ${trail.get('trigger_price', 0):.3f}"
+                        f"Trailing stop TRIGGERED for {position.symbol}! Price ${position.current_price:.3f} <= Trigger ${trail.trigger_price:.3f}"
                     )
 
-    def update_trailing_stop_state(self, position: LongPosition) -> Dict[str, any]:
-        """Ensure trail_stop_data exists and update highest/trigger/triggered flags.
+    def update_trailing_stop_state(self, position: LongPosition, now: Optional[float] = None) -> TrailStopData:
+        """Update highest/trigger/triggered flags on the position's trail_stop_data.
         Does not submit orders; orchestration happens elsewhere.
+        Callers updating many positions should pass a shared `now` timestamp.
         """
-        if not hasattr(position, 'trail_stop_data') or not isinstance(position.trail_stop_data, dict):
-            position.trail_stop_data = {
-                'enabled': False,
-                'percent': 20.0,
-                'highest_price': position.current_price,
-                'trigger_price': 0.0,
-                'triggered': False,
-                'order_submitted': False,
-                'order_id': None,
-                'last_update_time': 0.0,
-                'last_order_id': None
-            }
-        trail = position.trail_stop_data
-        if trail.get('enabled') and position.current_price and not trail.get('order_submitted', False):
-            # Ratchet highest price
-            if position.current_price > (trail.get('highest_price') or 0):
-                trail['highest_price'] = position.current_price
-            # Compute trigger
-            pct = float(trail.get('percent', 20.0) or 20.0)
-            trail['trigger_price'] = (trail.get('highest_price') or position.current_price) * (1 - pct / 100.0)
-            trail['triggered'] = position.current_price <= trail['trigger_price']
-            trail['last_update_time'] = datetime.datetime.now().timestamp()
-        return trail
+        with self._lock:  # Shared with the monitoring thread
+            trail = position.trail_stop_data
+            price = position.current_price
+            if trail.enabled and price and not trail.order_submitted:
+                # Unchanged quote: highest/trigger/triggered are already current
+                if price != trail.last_seen_price:
+                    # Ratchet highest price
+                    highest = trail.highest_price
+                    if price > highest:
+                        highest = trail.highest_price = price
+                    # Compute trigger
+                    pct = trail.percent
+                    trigger = highest * (1 - pct / 100.0)
+                    trail.trigger_price = trigger
+                    trail.triggered = price <= trigger
+                    trail.last_seen_price = price
+                trail.last_update_time = now if now is not None else time.time()
+            return trail
     
     def set_take_profit(self, account_number: str, symbol: str, percent: float) -> bool:
         """Set take profit for a position"""
+        position = self.get_position(account_number, symbol)
+        if not position:
+            return False
+        
+        # Update current price first (the monitor's last quote is fresh enough); fetched outside the lock
+        self.calculate_pnl(position, max_age=PRICE_MAX_AGE)
+        
         with self._lock:
-            position = self.get_position(account_number, symbol)
-            if not position:
-                return False
-            
-            # Update current price first
-            self.calculate_pnl(position)
-            
             if position.current_price <= 0:
                 return False
             
             # Set take profit
-            take_profit_data = {
-                'enabled': True,
-                'percent': percent,
-                'trigger_price': position.current_price * (1 + percent / 100),
-                'triggered': False
-            }
+            take_profit_data = dict(
+                TAKE_PROFIT_DEFAULTS,
+                enabled=True,
+                percent=percent,
+                target_pnl=float(percent),
+                trigger_price=position.current_price * (1 + percent / 100)
+            )
             
             # Store take profit data on position
-            setattr(position, 'take_profit_data', take_profit_data)
+            position.take_profit_data = take_profit_data
             
             self.logger.info(f"Set take profit for {symbol}: {percent}% at ${take_profit_data['trigger_price']:.3f}")
             return True
 
     def update_take_profit_state(self, position: LongPosition) -> Dict[str, any]:
-        """Ensure take_profit_data exists and update its triggered flag based on pnl_percent."""
-        if not hasattr(position, 'take_profit_data'):
-            position.take_profit_data = {
-                'enabled': False,
-                'percent': 50.0,
-                'target_pnl': 50.0,
-                'triggered': False
-            }
-        tp = position.take_profit_data
-        if tp.get('enabled'):
-            tp['target_pnl'] = float(tp.get('percent', 50.0))
-            tp['triggered'] = position.pnl_percent >= float(tp['percent'])
-        else:
-            tp['triggered'] = False
-        return tp
+        """Update take_profit_data's triggered flag based on pnl_percent."""
+        with self._lock:
+            tp = position.take_profit_data
+            if tp['enabled']:
+                tp['target_pnl'] = float(tp['percent'])
+                tp['triggered'] = position.pnl_percent >= float(tp['percent'])
+            else:
+                tp['triggered'] = False
+            return tp
+
+    def disable_take_profit(self, account_number: str, symbol: str) -> Optional[LongPosition]:
+        """Disable take profit for a position; returns the position or None if not found"""
+        with self._lock:
+            position = self.get_position(account_number, symbol)
+            if not position:
+                return None
+            take_profit = position.take_profit_data
+            take_profit['enabled'] = False
+            take_profit['triggered'] = False
+            return position
 
     def prepare_take_profit_order(self, account_number: str, symbol: str) -> Dict[str, any]:
         """Compute a conservative limit price to realize the configured take-profit percent.
@@ -380,7 +620,7 @@ class PositionManager:
             if not position:
                 return {'success': False, 'error': f'Position {symbol} not found'}
             tp = self.update_take_profit_state(position)
-            if not tp.get('enabled'):
+            if not tp['enabled']:
                 return {'success': False, 'error': 'Take profit not enabled'}
             # Target account-level proceeds equals open_premium * (1 + percent/100)
             target_value = position.open_premium * (1 + float(tp['percent']) / 100.0)
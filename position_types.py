@@ -5,7 +5,35 @@ Shared position classes to avoid circular imports
 """
 
 from dataclasses import dataclass
-from typing import List
+from types import MappingProxyType
+from typing import Dict, List, Optional
+
+@dataclass(slots=True)
+class TrailStopData:
+    """Trailing stop state for a position"""
+    enabled: bool = False
+    percent: float = 20.0
+    highest_price: float = 0.0
+    trigger_price: float = 0.0
+    triggered: bool = False
+    order_submitted: bool = False
+    order_id: Optional[str] = None
+    last_update_time: float = 0.0
+    last_order_id: Optional[str] = None
+    last_seen_price: Optional[float] = None  # Price the trigger/triggered fields were computed from
+    
+    def to_dict(self) -> Dict:
+        """Plain-dict snapshot for JSON responses"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+# Read-only template for take_profit_data
+TAKE_PROFIT_DEFAULTS = MappingProxyType({
+    'enabled': False,
+    'percent': 50.0,
+    'target_pnl': 50.0,
+    'trigger_price': 0.0,
+    'triggered': False
+})
 
 @dataclass
 class LongPosition:
@@ -20,7 +48,15 @@ class LongPosition:
     pnl: float = 0.0
     pnl_percent: float = 0.0
     option_ids: List[str] = None
+    trail_stop_data: TrailStopData = None
+    take_profit_data: Dict = None
+    pnl_updated_at: float = 0.0  # time.monotonic() of the last quote applied by calculate_pnl
     
     def __post_init__(self):
         if self.option_ids is None:
-            self.option_ids = []
\ No newline at end of file
+            self.option_ids = []
+        # Initialize trailing stop state once so hot paths never need a default
+        if self.trail_stop_data is None:
+            self.trail_stop_data = TrailStopData(highest_price=self.current_price)
+        if self.take_profit_data is None:
+            self.take_profit_data = dict(TAKE_PROFIT_DEFAULTS)
@@ -1,14 +1,36 @@
 import logging
+import logging.handlers
+import queue
+import atexit
 import json
 import datetime
 import os
 from typing import Dict, Any, Optional
 
+
+class _LazyJson:
+    """Log argument serialized to JSON only when the record is formatted"""
+    __slots__ = ('obj',)
+    
+    def __init__(self, obj):
+        self.obj = obj
+    
+    def __str__(self):
+        return json.dumps(self.obj)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records unformatted so message building runs on the listener thread"""
+    
+    def prepare(self, record):
+        return record
+
 class RiskManagerLogger:
     """Handles logging for the risk manager: actions and real orders"""
     
     def __init__(self, log_dir: str = 'logs'):
         self.log_dir = log_dir
+        self._listeners = []
         self._ensure_log_directory()
         self._setup_loggers()
     
@@ -30,8 +52,7 @@ class RiskManagerLogger:
             formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
             main_handler.setFormatter(formatter)
             console_handler.setFormatter(formatter)
-            self.main_logger.addHandler(main_handler)
-            self.main_logger.addHandler(console_handler)
+            self._attach_queue(self.main_logger, main_handler, console_handler)
         
         # Real orders logger
         self.real_orders_logger = logging.getLogger('real_orders')
@@ -39,11 +60,31 @@ class RiskManagerLogger:
             self.real_orders_logger.setLevel(logging.INFO)
             real_handler = logging.FileHandler(os.path.join(self.log_dir, f'real_orders_{date_str}.log'))
             real_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
-            self.real_orders_logger.addHandler(real_handler)
+            # Order payloads are serialized by the listener thread, off the submission path
+            self._attach_queue(self.real_orders_logger, real_handler, deferred=True)
             self.real_orders_logger.propagate = False
         
         # Simulation logging removed
     
+    def _attach_queue(self, logger: logging.Logger, *handlers: logging.Handler, deferred: bool = False):
+        """Route a logger through a queue so file/console writes happen on a listener thread.
+        With deferred=True, message formatting also moves to the listener thread; callers
+        must not mutate logged arguments afterwards.
+        """
+        log_queue = queue.SimpleQueue()
+        queue_handler_class = _DeferredQueueHandler if deferred else logging.handlers.QueueHandler
+        logger.addHandler(queue_handler_class(log_queue))
+        listener = logging.handlers.QueueListener(log_queue, *handlers)
+        listener.start()
+        if not self._listeners:
+            atexit.register(self.close)  # Flush pending records on shutdown
+        self._listeners.append(listener)
+    
+    def close(self):
+        """Stop listener threads after draining any queued records"""
+        while self._listeners:
+            self._listeners.pop().stop()
+    
     def log_session_start(self):
         """Log the start of a risk manager session"""
         self.main_logger.info("="*60)
@@ -68,6 +109,8 @@ class RiskManagerLogger:
                       response: Dict[str, Any],
                       order_type: str = 'limit'):
         """Log a real Robinhood order (non-blocking)"""
+        if not self.real_orders_logger.isEnabledFor(logging.INFO):
+            return  # Skip serializing the response when nothing would be written
         try:
             order_data = {
                 'order_id': order_id,
@@ -78,7 +121,7 @@ class RiskManagerLogger:
                 'request': request_params,
                 'response': response
             }
-            self.real_orders_logger.info(json.dumps(order_data))
+            self.real_orders_logger.info('%s', _LazyJson(order_data))
         except Exception:
             pass  # Don't let logging errors block order processing
     
@@ -86,6 +129,8 @@ class RiskManagerLogger:
     
     def log_order_update(self, order_id: str, status: str, details: Optional[Dict] = None):
         """Log order status updates"""
+        if not self.main_logger.isEnabledFor(logging.INFO):
+            return
         try:
             message = f"Order {order_id}: {status}"
             if details:
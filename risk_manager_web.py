@@ -5,6 +5,7 @@ Supports both single-account (legacy) and multi-account modes
 """
 
 from flask import Flask, render_template, jsonify, request, redirect, url_for
+from flask.json.provider import DefaultJSONProvider
 import json
 import datetime
 import threading
@@ -21,14 +22,43 @@ from multi_account_manager import MultiAccountRiskManager
 from shared.order_service import OrderService
 from position_manager import position_manager
 
+try:
+    import orjson  # Optional: faster JSON serialization for API responses
+except ImportError:
+    orjson = None
+
+try:
+    import waitress  # Optional: multi-threaded production WSGI server
+except ImportError:
+    waitress = None
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson; falls back to Flask's default() for other types"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """jsonify() path: hand orjson's bytes straight to the response (no str round-trip)"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS),
+            mimetype=self.mimetype
+        )
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrJSONProvider(app)
 
 # Initialize logger
 rm_logger = RiskManagerLogger()
 rm_logger.log_session_start()
 logger = rm_logger.main_logger  # For backwards compatibility
 
-# Initialize order service
+# Initialize order service (also tunes robin_stocks' shared HTTP session)
 order_service = OrderService(rm_logger)
 position_manager.set_order_service(order_service)
 
@@ -52,24 +82,11 @@ def json_err(message, status=400, **extra):
         payload.update(extra)
     return jsonify(payload), status
 
-def is_market_hours() -> bool:
-    """Check if market is currently open"""
-    from datetime import datetime
-    import pytz
-    
-    # Get current Eastern time directly
-    et = pytz.timezone('America/New_York')
-    now = datetime.now(et)
-    
-    # Check if weekday
-    if now.weekday() >= 5:  # Saturday=5, Sunday=6
-        return False
-    
-    # Market hours: 9:30 AM to 4:00 PM ET
-    market_open = now.replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close = now.replace(hour=16, minute=0, second=0, microsecond=0)
-    
-    return market_open <= now <= market_close
+def _fmt_ts(ns):
+    """Format an epoch-nanosecond timestamp as ISO-8601 UTC for the UI"""
+    if not ns:
+        return ''
+    return datetime.datetime.fromtimestamp(ns / 1e9, datetime.timezone.utc).isoformat()
 
 # Utility functions for order management and simulation
 
@@ -118,8 +135,7 @@ def risk_manager_for_account(account_prefix):
     account_number = account_info['number']  # Get full account number for internal use
     
     # Start monitoring only if not already started to avoid duplicate loads
-    if not multi_account_manager.get_account_risk_manager(account_number):
-        multi_account_manager.start_account_monitoring(account_number)
+    multi_account_manager.ensure_account_monitoring(account_number)
     
     return render_template('risk_manager.html', 
                          account_prefix=account_prefix,
@@ -127,28 +143,38 @@ def risk_manager_for_account(account_prefix):
                          account_info=account_info,
                          live_trading_mode=live_trading_mode)
 
-def _build_positions_response(risk_manager, account_number=None):
-    """Build positions response data"""
-    global live_trading_mode  # Make sure we access the global variable
+# Short-lived per-account cache of the positions payload so concurrent polls share one build
+POSITIONS_CACHE_TTL = 1.0  # seconds; matches the market-hours monitoring cadence
+_positions_cache = {}  # {account_number: (computed_at_monotonic, payload, etag)}
+_positions_cache_locks = {}  # {account_number: Lock} serializes rebuilds per account
+_positions_cache_guard = threading.Lock()
+
+def _invalidate_positions_cache(account_number):
+    """Drop the cached positions payload after a configuration or order change"""
+    _positions_cache.pop(account_number, None)
+
+def _compute_positions_payload(risk_manager, account_number=None):
+    """Build the positions payload (without last_update) and its content ETag"""
     positions_data = []
-    total_pnl = 0
+    etag_state = []
+    now_ts = time.time()
     
-    for pos_key, position in risk_manager.positions.items():
-        # Calculate current P&L via PositionManager
-        position_manager.calculate_pnl(position)
-        total_pnl += position.pnl
-        
-        # Add trailing stop data via PositionManager
-        trail_stop_data = position_manager.update_trailing_stop_state(position)
+    # Prices are refreshed by the account's monitoring thread; requests only read them
+    total_pnl = risk_manager.total_pnl()
+    
+    # Snapshot the position map; trail/take-profit state below is read under PositionManager's lock
+    for pos_key, position in list(risk_manager.positions.items()):
+        # Add trailing stop data via PositionManager (snapshotted as a dict for the cached payload)
+        trail_stop_data = position_manager.update_trailing_stop_state(position, now_ts).to_dict()
         
         # Add take profit data (delegate to PositionManager to update flags)
-        take_profit_data = position_manager.update_take_profit_state(position)
+        take_profit_data = dict(position_manager.update_take_profit_state(position))
         
         # Trailing stop state (highest/trigger/triggered) already computed by PositionManager
         
         # Generate close order parameters
         if trail_stop_data['enabled']:
-            limit_price = trail_stop_data['trigger_price']
+            limit_price = round(trail_stop_data['trigger_price'], 2)
         else:
             limit_price = round(position.current_price * 0.95, 2)
         
@@ -157,7 +183,7 @@ def _build_positions_response(risk_manager, account_number=None):
         close_order = {
             'positionEffect': 'close',
             'creditOrDebit': 'credit',
-            'price': round(limit_price, 2),
+            'price': limit_price,
             'symbol': position.symbol,
             'quantity': position.quantity,
             'expirationDate': position.expiration_date,
@@ -168,6 +194,7 @@ def _build_positions_response(risk_manager, account_number=None):
         }
         
         position_data = {
+            'position_key': pos_key,
             'symbol': position.symbol,
             'strike_price': position.strike_price,
             'option_type': position.option_type.upper(),
@@ -184,21 +211,55 @@ def _build_positions_response(risk_manager, account_number=None):
         }
         
         positions_data.append(position_data)
-    
-    response = {
+        etag_state.append((
+            pos_key, position.current_price, position.pnl,
+            trail_stop_data['enabled'], trail_stop_data['percent'], trail_stop_data['trigger_price'],
+            trail_stop_data['triggered'], trail_stop_data['order_submitted'],
+            take_profit_data['enabled'], take_profit_data['percent'], take_profit_data['triggered']
+        ))
+    
+    market_open = risk_manager.is_market_hours()
+    # Content tag over the fields that can change between polls (not last_update)
+    etag = format(hash((tuple(etag_state), market_open, live_trading_mode, account_number)) & 0xFFFFFFFFFFFFFFFF, 'x')
+    
+    payload = {
         'positions': positions_data,
         'total_pnl': total_pnl,
-        'market_open': risk_manager.is_market_hours(),
-        'live_trading_mode': live_trading_mode,
-        'last_update': datetime.datetime.now().strftime('%H:%M:%S')
+        'market_open': market_open,
+        'live_trading_mode': live_trading_mode
     }
     
     # Add account info
     if account_number:
-        response['account_number'] = account_number
-        response['account_display'] = f"...{account_number[-4:]}"
+        payload['account_number'] = account_number
+        payload['account_display'] = f"...{account_number[-4:]}"
+    
+    return payload, etag
+
+def _cached_positions_payload(risk_manager, account_number):
+    """Return (payload, etag), rebuilding at most once per POSITIONS_CACHE_TTL per account"""
+    with _positions_cache_guard:
+        lock = _positions_cache_locks.setdefault(account_number, threading.Lock())
+    with lock:
+        entry = _positions_cache.get(account_number)
+        if entry and time.monotonic() - entry[0] < POSITIONS_CACHE_TTL:
+            return entry[1], entry[2]
+        payload, etag = _compute_positions_payload(risk_manager, account_number)
+        _positions_cache[account_number] = (time.monotonic(), payload, etag)
+        return payload, etag
+
+def _build_positions_response(risk_manager, account_number=None):
+    """Build positions response data"""
+    payload, etag = _cached_positions_payload(risk_manager, account_number)
+    if request.if_none_match.contains(etag):
+        not_modified = app.response_class(status=304)
+        not_modified.set_etag(etag)
+        return not_modified
     
-    return jsonify(response)
+    resp = jsonify(dict(payload, last_update=datetime.datetime.now().strftime('%H:%M:%S')))
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'  # Always revalidate with If-None-Match
+    return resp
 
 def get_account_context(account_prefix):
     """Resolve account context (account_number, risk_manager) or return an error response."""
@@ -238,20 +299,18 @@ def get_account_positions(account_prefix):
         })
     
     account_number = account_info['number']
-    risk_manager = multi_account_manager.get_account_risk_manager(account_number)
+    # Start monitoring for this account if no request has done so yet
+    risk_manager = multi_account_manager.ensure_account_monitoring(account_number)
     if not risk_manager:
-        # Try to start monitoring for this account
-        multi_account_manager.start_account_monitoring(account_number)
-        risk_manager = multi_account_manager.get_account_risk_manager(account_number)
-        
-        if not risk_manager:
-            return jsonify({
-                'positions': [],
-                'total_pnl': 0,
-                'market_open': False,
-                'error': f'Account ...{account_number[-4:]} not found or has no positions',
-                'last_update': datetime.datetime.now().strftime('%H:%M:%S')
-            })
+        return jsonify({
+            'positions': [],
+            'total_pnl': 0,
+            'market_open': False,
+            'error': f'Account ...{account_number[-4:]} not found or has no positions',
+            'last_update': datetime.datetime.now().strftime('%H:%M:%S')
+        })
+    
+    multi_account_manager.note_dashboard_poll(account_number)
     
     # Use positions loaded by monitoring thread (no need to reload on every request)
     if len(risk_manager.positions) == 0:
@@ -285,73 +344,95 @@ def close_account_simulation(account_prefix):
     if not risk_manager:
         return json_err(f'Account ...{account_number[-4:]} not found')
     
-    print(f"\n{'='*60}")
-    print(f"🔥 LIVE TRADING MODE - Account ...{account_number[-4:]}: SUBMITTING REAL ORDERS FOR {len(positions_data)} POSITION(S)")
-    print(f"{'='*60}")
+    if not live_trading_mode:
+        return jsonify({
+            'success': False,
+            'error': 'Live trading required. Start with --live to submit orders.',
+            'account_number': account_number
+        }), 400
+    
+    logger.info(f"LIVE TRADING MODE - Account ...{account_number[-4:]}: SUBMITTING REAL ORDERS FOR {len(positions_data)} POSITION(S)")
     
     order_results = []
-    positions_list = list(risk_manager.positions.items())
+    skipped_results = []
+    selected_positions = []
+    selected_keys = []
+    seen_keys = set()
+    limit_prices = []
+    log_details = logger.isEnabledFor(logging.INFO)  # Skip building per-position text nobody will see
     
     # Process positions - now handling full position objects with custom prices
     for idx, position_data in enumerate(positions_data):
+        pos_key = None
+        position = None
         # Extract limit price from the frontend data
         if isinstance(position_data, dict) and 'close_order' in position_data:
             limit_price = position_data['close_order']['price']
             estimated_proceeds = position_data['close_order']['estimated_proceeds']
             
-            # Find the actual position in the risk manager
-            pos_key = None
-            position = None
-            for key, pos in positions_list:
-                if (pos.symbol == position_data['symbol'] and 
-                    float(pos.strike_price) == float(position_data['strike_price']) and
-                    pos.option_type.lower() == position_data['option_type'].lower() and
-                    pos.expiration_date == position_data['expiration_date']):
-                    pos_key = key
-                    position = pos
-                    break
+            # Direct lookup by the key emitted in the positions response
+            pos_key = position_data.get('position_key')
+            position = risk_manager.positions.get(pos_key) if pos_key else None
         else:
             # Fallback to old behavior if we get an index
-            if idx < len(positions_list):
-                pos_key, position = positions_list[idx]
+            pos_key, position = risk_manager.position_at(idx)
+            if position is not None:
                 limit_price = round(position.current_price * 0.95, 2)
                 estimated_proceeds = limit_price * position.quantity * 100
         
         if position is None:
             continue
+        # A repeated selection (double click, retried request) must not become a second live order
+        if pos_key in seen_keys:
+            logger.warning(f"Position {idx + 1}: {position.symbol} selected more than once; submitting it once")
+            continue
+        seen_keys.add(pos_key)
+        recent_order_id = position_manager.recent_close_order(account_number, pos_key)
+        if recent_order_id:
+            logger.warning(f"Position {idx + 1}: {position.symbol} already has close order {recent_order_id}; skipping")
+            skipped_results.append({
+                'symbol': position.symbol,
+                'limit_price': limit_price,
+                'account': f"...{account_number[-4:]}",
+                'error': f'Close order {recent_order_id} was just submitted for this position',
+                'order_id': recent_order_id
+            })
+            continue
             
-        print(f"\n📈 Position {idx + 1}: {position.symbol} {position.strike_price}{position.option_type.upper()} {position.expiration_date}")
-        print(f"   Premium Paid: ${position.open_premium:.2f}")
-        print(f"   Current Price: ${position.current_price:.2f}")
-        print(f"   Limit Price: ${limit_price:.2f}")
-        print(f"   Estimated Proceeds: ${estimated_proceeds:.2f}")
+        # One record per position: a single queue hand-off instead of five
+        if log_details:
+            logger.info(
+                f"Position {idx + 1}: {position.symbol} {position.strike_price}{position.option_type.upper()} {position.expiration_date}\n"
+                f"   Premium Paid: ${position.open_premium:.2f}\n"
+                f"   Current Price: ${position.current_price:.2f}\n"
+                f"   Limit Price: ${limit_price:.2f}\n"
+                f"   Estimated Proceeds: ${estimated_proceeds:.2f}"
+            )
         
-        order_info = {
+        order_results.append({
             'symbol': position.symbol,
             'limit_price': limit_price,
             'estimated_proceeds': estimated_proceeds,
             'account': f"...{account_number[-4:]}",
             
-        }
-        
-        if not live_trading_mode:
-            return jsonify({
-                'success': False,
-                'error': 'Live trading required. Start with --live to submit orders.',
-                'account_number': account_number
-            }), 400
-
-        print(f"   🔥 SUBMITTING REAL ORDER...")
-        order_result = position_manager.submit_close_order(account_number, position, limit_price)
+        })
+        selected_positions.append(position)
+        selected_keys.append(pos_key)
+        limit_prices.append(limit_price)
+    
+    # Submit all selected orders together so their round-trips overlap
+    logger.info(f"   SUBMITTING {len(selected_positions)} REAL ORDER(S)...")
+    submit_results = position_manager.submit_close_orders(account_number, selected_positions, limit_prices, selected_keys)
+    for order_info, order_result in zip(order_results, submit_results):
         if order_result['success']:
             order_info.update(order_result)
-            print(f"   ✅ REAL ORDER SUBMITTED: {order_result['order_id']}")
+            logger.info(f"   REAL ORDER SUBMITTED: {order_info['symbol']} {order_result['order_id']}")
         else:
             order_info['error'] = order_result['error']
-            print(f"   ❌ ORDER FAILED: {order_result['error']}")
-
-        order_results.append(order_info)
+            logger.error(f"   ORDER FAILED: {order_info['symbol']} {order_result['error']}")
+    order_results.extend(skipped_results)
     
+    _invalidate_positions_cache(account_number)
     return jsonify({
         'success': True,
         'message': f'LIVE ORDERS SUBMITTED for account ...{account_number[-4:]}: {len(positions_data)} position(s) processed',
@@ -383,11 +464,13 @@ def configure_account_trailing_stop(account_prefix):
                 f'Could not enable trailing stop for {symbol} - position not found or invalid price',
                 account_number=account_number
             )
+        _invalidate_positions_cache(account_number)
+        multi_account_manager.wake_account_monitoring(account_number)  # Start following the trail now
     else:
-        position = position_manager.get_position(account_number, symbol)
+        position = position_manager.disable_trailing_stop(account_number, symbol)
         if position:
-            trail = getattr(position, 'trail_stop_data', {})
-            trail['enabled'] = False
+            trail = position.trail_stop_data.to_dict()
+            _invalidate_positions_cache(account_number)
             logger.info(f"Account ...{account_number[-4:]}: Trailing stop disabled for {symbol}")
             return jsonify({
                 'success': True,
@@ -412,28 +495,29 @@ def configure_account_trailing_stop(account_prefix):
     if not live_trading_mode:
         return json_err('Live trading required. Start with --live to submit trailing stop orders.', account_number=account_number)
 
-    print(f"   🔥 SUBMITTING REAL TRAILING STOP ORDER...")
+    logger.info(f"Account ...{account_number[-4:]}: SUBMITTING REAL TRAILING STOP ORDER for {symbol}")
     order_result = position_manager.submit_trailing_stop(account_number, position, limit_price, stop_price)
     order_info = {
         'symbol': position.symbol,
         'limit_price': limit_price,
         'stop_price': stop_price,
         'estimated_proceeds': limit_price * position.quantity * 100,
-        'api_call': f'Trailing Stop: Stop=${stop_price:.2f}, Limit=${limit_price:.2f}',
+        'order_type': 'stop_limit',
         'account': f"...{account_number[-4:]}",
         'simulated': False
     }
     if order_result['success']:
         order_info.update(order_result)
-        print(f"   ✅ REAL TRAILING STOP ORDER: {order_result['order_id']}")
+        logger.info(f"   REAL TRAILING STOP ORDER: {order_result['order_id']}")
     else:
         order_info['error'] = order_result['error']
-        print(f"   ❌ TRAILING STOP ORDER FAILED: {order_result['error']}")
+        logger.error(f"   TRAILING STOP ORDER FAILED: {order_result['error']}")
+    _invalidate_positions_cache(account_number)
 
     return jsonify({
         'success': True,
         'message': f'Trailing stop enabled for {symbol}',
-        'config': getattr(position, 'trail_stop_data', {}),
+        'config': position.trail_stop_data.to_dict(),
         'order_created': order_info,
         'account_number': account_number
     })
@@ -464,12 +548,12 @@ def configure_account_take_profit(account_prefix):
                 f'Could not set take profit for {symbol} - position not found or invalid price',
                 account_number=account_number
             )
+        _invalidate_positions_cache(account_number)
     else:
         # Disable take profit
-        position = position_manager.get_position(account_number, symbol)
+        position = position_manager.disable_take_profit(account_number, symbol)
         if position:
-            take_profit_data = getattr(position, 'take_profit_data', {})
-            take_profit_data['enabled'] = False
+            _invalidate_positions_cache(account_number)
             logger.info(f"Account ...{account_number[-4:]}: Take profit disabled for {symbol}")
         else:
             return json_err(
@@ -498,21 +582,37 @@ def refresh_tracked_orders(account_prefix):
     
     account_number = account_info['number']
     orders = []
-    # Only refresh our tracked live orders (efficient individual queries)
+    # Only refresh our tracked live orders; settled orders and orders still in
+    # backoff are served from the last cached details
     try:
         tracked = position_manager.get_tracked_order_ids(account_number)
-        for order_id, order_info in tracked.items():
+        now = time.monotonic()
+        due_ids = [oid for oid, info in tracked.items() if position_manager.order_refresh_due(info, now)]
+        fetched = {}
+        if due_ids:
+            # One request for all due orders instead of one round-trip per order
+            batch = order_service.get_orders_info(due_ids)
+            if batch.get('success'):
+                fetched = batch['details']
+            else:
+                logger.error(f"Error fetching tracked orders: {batch.get('error')}")
+        # Settled orders come from the archive; only the active set is ever polled
+        for order_id, order_info in {**position_manager.get_archived_orders(account_number), **tracked}.items():
             try:
-                od_resp = order_service.get_order_info(order_id)
-                if od_resp.get('success') and od_resp.get('details'):
-                    od = od_resp['details']
+                od = fetched.get(order_id)
+                if od:
+                    position_manager.record_order_status(account_number, order_id, od, now)
+                else:
+                    # Orders restored from the orders file keep only their last state, not full details
+                    od = order_info.get('details') or ({'state': order_info['state']} if order_info.get('state') else None)
+                if od:
                     orders.append({
                         'id': order_id,
                         'symbol': order_info.get('symbol', 'Unknown'),
                         'state': od.get('state', 'unknown'),
                         'price': float(od.get('price', order_info.get('price', 0))),
                         'quantity': int(float(od.get('quantity', 0))) if od.get('quantity') is not None else order_info.get('quantity', 0),
-                        'submit_time': od.get('created_at', order_info.get('submit_time', '')),
+                        'submit_time': od.get('created_at') or _fmt_ts(order_info.get('submit_time_ns')),
                         'order_type': od.get('type', order_info.get('order_type', 'limit')),
                         'simulated': False
                     })
@@ -551,8 +651,8 @@ def check_account_orders(account_prefix):
         })
     
     try:
-        # Use OrderService to fetch open orders (limited pages)
-        os_resp = order_service.list_open_orders(max_pages=5)
+        # Use OrderService to fetch open orders (limited pages, briefly cached)
+        os_resp = order_service.list_open_orders()
         if not os_resp.get('success'):
             return jsonify({
                 'success': False,
@@ -635,14 +735,7 @@ def cancel_order(order_id):
         return json_err('Live trading required. Start with --live to cancel orders.')
     try:
         # account context is not necessary for cancel, but we attempt to keep stores consistent
-        # We'll scan all accounts tracked orders to find the owning account
-        owning_account = None
-        for acc_prefix, acc_info in account_detector.detect_accounts().items():
-            acct_num = acc_info['number']
-            tracked = position_manager.get_tracked_order_ids(acct_num)
-            if order_id in tracked:
-                owning_account = acct_num
-                break
+        owning_account = position_manager.find_order_account(order_id)
         result = position_manager.cancel_order(owning_account or '', order_id)
         if result.get('success'):
             return jsonify({
@@ -653,6 +746,26 @@ def cancel_order(order_id):
     except Exception as e:
         return json_err(str(e))
 
+@app.route('/api/cancel-orders', methods=['POST'])
+def cancel_orders():
+    """Cancel several orders by ID in one request (live-only)."""
+    if not live_trading_mode:
+        return json_err('Live trading required. Start with --live to cancel orders.')
+    data = request.get_json(silent=True) or {}
+    order_ids = data.get('ids') or []
+    if not isinstance(order_ids, list) or not order_ids:
+        return json_err('Provide a non-empty "ids" list of order IDs')
+    try:
+        results = position_manager.cancel_orders([str(order_id) for order_id in order_ids])
+        failed = [order_id for order_id, result in results.items() if not result.get('success')]
+        return jsonify({
+            'success': not failed,
+            'message': f'Cancellation requested for {len(results) - len(failed)} of {len(results)} order(s)',
+            'results': results
+        })
+    except Exception as e:
+        return json_err(str(e))
+
 def initialize_system():
     """Initialize the multi-account system with single login"""
     global multi_account_manager, account_detector
@@ -709,9 +822,14 @@ if __name__ == '__main__':
                        help='Enable live trading mode (DANGER: Will place real orders!)')
     parser.add_argument('--port', type=int, default=5001,
                        help='Port to run the web server on (default: 5001)')
+    parser.add_argument('--orders-file', default=os.path.join(rm_logger.log_dir, 'tracked_orders.json'),
+                       help='JSON file that keeps tracked orders across restarts ("" to disable)')
     
     args = parser.parse_args()
     
+    if args.orders_file:
+        position_manager.enable_order_persistence(args.orders_file)
+    
     # Set live trading mode based on command line argument
     live_trading_mode = args.live
     
@@ -745,7 +863,13 @@ if __name__ == '__main__':
         try:
             # Disable debug mode for live trading to avoid restart prompts
             debug_mode = not live_trading_mode
-            app.run(debug=debug_mode, host='0.0.0.0', port=args.port)
+            if waitress is not None:
+                logger.info("Serving with waitress (8 worker threads)")
+                waitress.serve(app, host='0.0.0.0', port=args.port, threads=8)
+            else:
+                # The reloader re-runs this module in a child process, which would
+                # log in again and start a second set of monitoring threads
+                app.run(debug=debug_mode, use_reloader=False, threaded=True, host='0.0.0.0', port=args.port)
         except KeyboardInterrupt:
             logger.info("Multi-Account Risk Manager shutdown requested by user")
             print("\nShutting down...")
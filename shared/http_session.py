@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+HTTP Session Tuning
+Configures the shared robin_stocks requests session (connection pool + retries).
+"""
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from robin_stocks.robinhood.globals import SESSION
+
+
+def configure_robinhood_session(pool_connections: int = 10, pool_maxsize: int = 20) -> None:
+    """Mount a pooled, retrying adapter on robin_stocks' global session.
+
+    Monitoring threads and request threads share this session, so a larger
+    pool keeps connections alive instead of re-handshaking TLS. Retries use
+    urllib3's default idempotent method set, so order POSTs are never resent.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 502, 503, 504],
+        raise_on_status=False  # Hand the final response back to robin_stocks' own handling
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    SESSION.mount('https://', adapter)
+    SESSION.headers['Connection'] = 'keep-alive'
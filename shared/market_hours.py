@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Market Hours
+Regular-session check (9:30 AM - 4:00 PM ET, weekdays) shared by the web app and monitors.
+"""
+
+import datetime
+import time
+from typing import Optional
+import pytz
+
+_ET = pytz.timezone('America/New_York')
+_MARKET_OPEN = datetime.time(9, 30)
+_MARKET_CLOSE = datetime.time(16, 0)
+
+# (day_start, day_end, open, close) as POSIX timestamps for the current ET day;
+# open/close are None on weekends. Rebuilt only when the day rolls over.
+_session = (0.0, 0.0, None, None)
+
+
+def _session_bounds(ts: float) -> tuple:
+    """Compute the ET day containing `ts` and its regular-session bounds"""
+    day = datetime.datetime.fromtimestamp(ts, _ET).date()
+    day_start = _ET.localize(datetime.datetime.combine(day, datetime.time())).timestamp()
+    next_day = day + datetime.timedelta(days=1)
+    day_end = _ET.localize(datetime.datetime.combine(next_day, datetime.time())).timestamp()
+    if day.weekday() >= 5:  # Saturday=5, Sunday=6
+        return day_start, day_end, None, None
+    market_open = _ET.localize(datetime.datetime.combine(day, _MARKET_OPEN)).timestamp()
+    market_close = _ET.localize(datetime.datetime.combine(day, _MARKET_CLOSE)).timestamp()
+    return day_start, day_end, market_open, market_close
+
+
+def is_market_hours(now: Optional[float] = None) -> bool:
+    """Check if the market is currently open (or at POSIX time `now`)"""
+    global _session
+    if now is None:
+        now = time.time()
+    session = _session
+    if not session[0] <= now < session[1]:
+        session = _session = _session_bounds(now)
+    return session[2] is not None and session[2] <= now <= session[3]
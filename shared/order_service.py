@@ -5,49 +5,116 @@ Encapsulates robin_stocks order submissions and logging.
 """
 
 import datetime
-from typing import Optional, Dict, Any
+import threading
+import time
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
 import robin_stocks.robinhood as r
 import robin_stocks.robinhood.helper as helper
-from robin_stocks.robinhood.urls import option_orders_url
+from robin_stocks.robinhood.globals import SESSION
+from robin_stocks.robinhood.urls import option_orders_url, option_instruments_url
+from shared.http_session import configure_robinhood_session
+
+# Upper bound on concurrent order submissions/cancels (Robinhood has no batch order endpoint)
+MAX_ORDER_WORKERS = 8
+# Seconds an open-orders listing is reused; repeated UI refreshes within this share one fetch
+OPEN_ORDERS_CACHE_TTL = 1.5
+# Statuses robin_stocks' request_post hands back as a JSON body (4xx carry Robinhood's error detail)
+_POST_OK_STATUSES = frozenset({200, 201, 202, 204, 301, 302, 303, 304, 307, 400, 401, 402, 403})
 
 
 class OrderService:
+    # Fields shared by every sell-to-close request logged to the real-orders log
+    _CLOSE_TEMPLATE = {
+        'positionEffect': 'close',
+        'creditOrDebit': 'credit',
+        'timeInForce': 'gtc',
+        'stopPrice': None
+    }
+
     def __init__(self, rm_logger):
         """rm_logger: instance of RiskManagerLogger for structured logging"""
         self.rm_logger = rm_logger
+        # Reuse pooled keep-alive connections for every robin_stocks call (orders, cancels, quotes)
+        configure_robinhood_session()
+        self._open_orders_cache: Dict[int, tuple] = {}  # {max_pages: (fetched_at_monotonic, orders)}
+        self._open_orders_lock = threading.Lock()
+        # {(symbol, expiration_date, strike, option_type): instrument URL}; contracts never change URL
+        self._instrument_cache: Dict[tuple, str] = {}
+        self._account_url: Optional[str] = None
+
+    def _option_instrument_url(self, position) -> Optional[str]:
+        """Instrument URL for a position's contract, resolved at most once per contract."""
+        key = (position.symbol, position.expiration_date, float(position.strike_price), position.option_type)
+        url = self._instrument_cache.get(key)
+        if url is None:
+            # Positions loaded from Robinhood already carry the instrument id
+            option_id = position.option_ids[0] if position.option_ids else helper.id_for_option(
+                position.symbol, position.expiration_date, position.strike_price, position.option_type)
+            if not option_id:
+                return None
+            url = self._instrument_cache[key] = option_instruments_url(option_id)
+        return url
+
+    def _post_sell_to_close(self, position, **order_fields) -> Optional[Dict[str, Any]]:
+        """POST a sell-to-close option order (same payload as robin_stocks' order_sell_option_* helpers).
+
+        robin_stocks resolves the chain, the instrument and the account profile with three
+        GETs on every order; here the instrument and account URLs are cached. The JSON
+        Content-Type is set per request: helper.request_post(json=True) flips it on the
+        shared session, which races when close orders are posted from several threads.
+        """
+        instrument_url = self._option_instrument_url(position)
+        if self._account_url is None:
+            self._account_url = r.load_account_profile(info='url')
+        if not instrument_url or not self._account_url:
+            raise ValueError(f'Could not resolve option instrument or account for {position.symbol}')
+        payload = {
+            'account': self._account_url,
+            'direction': 'credit',
+            'time_in_force': 'gtc',
+            'legs': [
+                {'position_effect': 'close', 'side': 'sell', 'ratio_quantity': 1, 'option': instrument_url},
+            ],
+            'type': 'limit',
+            'quantity': position.quantity,
+            'override_day_trade_checks': False,
+            'override_dtbp_checks': False,
+            'ref_id': str(uuid4()),
+            **order_fields
+        }
+        res = SESSION.post(option_orders_url(), json=payload, headers={'Content-Type': 'application/json'}, timeout=16)
+        if res.status_code not in _POST_OK_STATUSES:
+            raise Exception(f'Received {res.status_code}')
+        return res.json()
+
+    def _invalidate_open_orders(self) -> None:
+        """Drop cached open-order listings after an order is placed or cancelled"""
+        self._open_orders_cache.clear()
 
     def submit_close(self, position, limit_price: float) -> Dict[str, Any]:
         """Submit a sell-to-close limit order for a long option position."""
         try:
-            time_sent = datetime.datetime.now()
-
-            order_result = r.order_sell_option_limit(
-                positionEffect='close',
-                creditOrDebit='credit',
-                price=round(limit_price, 2),
-                symbol=position.symbol,
-                quantity=position.quantity,
-                expirationDate=position.expiration_date,
-                strike=position.strike_price,
-                optionType=position.option_type,
-                timeInForce='gtc'
-            )
+            time_sent = datetime.datetime.now()  # One wall-clock read; elapsed time comes from the monotonic clock
+            sent_ns = time.monotonic_ns()
+            lp = round(limit_price, 2)
+
+            order_result = self._post_sell_to_close(position, trigger='immediate', price=lp)
 
             if order_result and 'id' in order_result:
                 order_id = order_result['id']
-                time_confirmed = datetime.datetime.now()
+                time_confirmed = time_sent + datetime.timedelta(microseconds=(time.monotonic_ns() - sent_ns) // 1000)
+                self._invalidate_open_orders()
 
                 request_params = {
-                    'positionEffect': 'close',
-                    'creditOrDebit': 'credit',
-                    'limitPrice': round(limit_price, 2),
-                    'stopPrice': None,
+                    **self._CLOSE_TEMPLATE,
+                    'limitPrice': lp,
                     'symbol': position.symbol,
                     'quantity': position.quantity,
                     'expirationDate': position.expiration_date,
                     'strike': position.strike_price,
-                    'optionType': position.option_type,
-                    'timeInForce': 'gtc'
+                    'optionType': position.option_type
                 }
 
                 self.rm_logger.log_real_order(
@@ -78,39 +145,41 @@ class OrderService:
                 'error': str(e)
             }
 
+    def submit_close_batch(self, positions: List, limit_prices: List[float]) -> List[Dict[str, Any]]:
+        """Submit sell-to-close orders for several positions; results are in input order.
+
+        Submissions overlap on a small thread pool so N orders cost about one
+        round-trip instead of N sequential ones.
+        """
+        if len(positions) <= 1:
+            return [self.submit_close(p, lp) for p, lp in zip(positions, limit_prices)]
+        with ThreadPoolExecutor(max_workers=min(len(positions), MAX_ORDER_WORKERS)) as executor:
+            return list(executor.map(self.submit_close, positions, limit_prices))
+
     def submit_trailing_stop(self, position, limit_price: float, stop_price: float) -> Dict[str, Any]:
         """Submit a stop-limit order for a long option position (trailing stop execution)."""
         try:
-            time_sent = datetime.datetime.now()
-
-            order_result = r.order_sell_option_stop_limit(
-                positionEffect='close',
-                creditOrDebit='credit',
-                limitPrice=round(limit_price, 2),
-                stopPrice=round(stop_price, 2),
-                symbol=position.symbol,
-                quantity=position.quantity,
-                expirationDate=position.expiration_date,
-                strike=position.strike_price,
-                optionType=position.option_type,
-                timeInForce='gtc'
-            )
+            time_sent = datetime.datetime.now()  # One wall-clock read; elapsed time comes from the monotonic clock
+            sent_ns = time.monotonic_ns()
+            lp = round(limit_price, 2)
+            sp = round(stop_price, 2)
+
+            order_result = self._post_sell_to_close(position, trigger='stop', price=lp, stop_price=sp)
 
             if order_result and 'id' in order_result:
                 order_id = order_result['id']
-                time_confirmed = datetime.datetime.now()
+                time_confirmed = time_sent + datetime.timedelta(microseconds=(time.monotonic_ns() - sent_ns) // 1000)
+                self._invalidate_open_orders()
 
                 request_params = {
-                    'positionEffect': 'close',
-                    'creditOrDebit': 'credit',
-                    'limitPrice': round(limit_price, 2),
-                    'stopPrice': round(stop_price, 2),
+                    **self._CLOSE_TEMPLATE,
+                    'limitPrice': lp,
+                    'stopPrice': sp,
                     'symbol': position.symbol,
                     'quantity': position.quantity,
                     'expirationDate': position.expiration_date,
                     'strike': position.strike_price,
-                    'optionType': position.option_type,
-                    'timeInForce': 'gtc'
+                    'optionType': position.option_type
                 }
 
                 self.rm_logger.log_real_order(
@@ -146,6 +215,7 @@ class OrderService:
         try:
             # robin_stocks exposes a cancel function for option orders
             result = r.cancel_option_order(order_id)
+            self._invalidate_open_orders()
             # Some versions return None on success; treat absence of error as success
             if result is None or (isinstance(result, dict) and result.get('state') in (None, 'canceled', 'cancelled')):
                 return {'success': True, 'message': f'Order {order_id} cancellation requested'}
@@ -154,6 +224,14 @@ class OrderService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def cancel_orders(self, order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Cancel several option orders concurrently; returns {order_id: cancel_order result}."""
+        order_ids = list(dict.fromkeys(order_ids))  # Drop repeats, keep order
+        if len(order_ids) <= 1:
+            return {order_id: self.cancel_order(order_id) for order_id in order_ids}
+        with ThreadPoolExecutor(max_workers=min(len(order_ids), MAX_ORDER_WORKERS)) as executor:
+            return dict(zip(order_ids, executor.map(self.cancel_order, order_ids)))
+
     def get_order_info(self, order_id: str) -> Dict[str, Any]:
         """Fetch details for a specific option order id."""
         try:
@@ -162,8 +240,53 @@ class OrderService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def get_orders_info(self, order_ids) -> Dict[str, Any]:
+        """Fetch details for several option orders.
+
+        A single order uses the per-id endpoint. Otherwise the most recent page
+        of option orders is fetched once and only ids missing from it fall back
+        to per-id requests. A failed request only affects the orders it covered:
+        a page failure sends every id to the per-id fallback, and an id whose own
+        request fails is left out. Returns {success, details: {order_id: details}}.
+        """
+        wanted = set(order_ids)
+        details = {}
+        if len(wanted) > 1:
+            try:
+                data = helper.request_get(option_orders_url(), 'regular')
+                for order in (data or {}).get('results', []):
+                    if order.get('id') in wanted:
+                        details[order['id']] = order
+            except Exception:
+                pass  # Fall back to per-id requests for everything
+        errors = []
+        for order_id in wanted - details.keys():
+            try:
+                order = r.get_option_order_info(order_id)
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            if order:
+                details[order_id] = order
+        if errors and not details:
+            return {'success': False, 'error': errors[0]}
+        return {'success': True, 'details': details}
+
     def list_open_orders(self, max_pages: int = 5) -> Dict[str, Any]:
-        """List open option orders by paging the Robinhood API (limited pages)."""
+        """List open option orders by paging the Robinhood API (limited pages).
+        Results are reused for OPEN_ORDERS_CACHE_TTL seconds; concurrent callers share one fetch.
+        """
+        with self._open_orders_lock:
+            cached = self._open_orders_cache.get(max_pages)
+            if cached and time.monotonic() - cached[0] < OPEN_ORDERS_CACHE_TTL:
+                return {'success': True, 'orders': cached[1]}
+            result = self._fetch_open_orders(max_pages)
+            if result['success']:
+                self._open_orders_cache[max_pages] = (time.monotonic(), result['orders'])
+            return result
+
+    def _fetch_open_orders(self, max_pages: int) -> Dict[str, Any]:
+        """Page through recent option orders (cursor paging is sequential) and keep the open ones."""
         try:
             url = option_orders_url()
             all_orders = []
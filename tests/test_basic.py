@@ -1,3 +1,4 @@
+import threading
 import types
 
 import pytest
@@ -64,17 +65,187 @@ def test_trailing_stop_state_and_base_delegate(monkeypatch):
     # Enable trailing stop at 20% and update state
     # Insert position into PositionManager store for account '0000'
     with pm_mod.position_manager._lock:
-        pm_mod.position_manager._positions.setdefault("0000", {})["TEST_2099-01-01_100.0_call"] = lp
+        pm_mod.position_manager._store_positions("0000", {"TEST_2099-01-01_100.0_call": lp})
     pm_mod.position_manager.enable_trailing_stop("0000", "TEST", 20.0)
     trail = pm_mod.position_manager.update_trailing_stop_state(lp)
-    assert trail["enabled"] is True
+    assert trail.enabled is True
     # highest_price should at least be the current price
-    assert round(trail["highest_price"], 2) == 3.00
-    assert round(trail["trigger_price"], 2) == round(3.00 * (1 - 0.20), 2)
-    assert trail["triggered"] is False
+    assert round(trail.highest_price, 2) == 3.00
+    assert round(trail.trigger_price, 2) == round(3.00 * (1 - 0.20), 2)
+    assert trail.triggered is False
 
     # If price drops below trigger, triggered should become True
     _mock_market_price(monkeypatch, 2.30)  # Below 2.40 trigger
     pm_mod.position_manager.calculate_pnl(lp)  # refresh price
     trail = pm_mod.position_manager.update_trailing_stop_state(lp)
-    assert trail["triggered"] is True
+    assert trail.triggered is True
+
+
+def test_tracked_order_backoff_and_settle():
+    pm = pm_mod.PositionManager()
+    pm._ensure_order_store("0000")
+    pm._tracked_orders["0000"]["ord1"] = {"symbol": "TEST", "order_type": "limit"}
+    entry = pm.get_tracked_order_ids("0000")["ord1"]
+
+    # New orders are due immediately; each non-terminal poll doubles the wait
+    assert pm.order_refresh_due(entry, 100.0) is True
+    pm.record_order_status("0000", "ord1", {"state": "confirmed"}, 100.0)
+    assert pm.order_refresh_due(entry, 100.5) is False
+    assert pm.order_refresh_due(entry, 101.0) is True
+    pm.record_order_status("0000", "ord1", {"state": "confirmed"}, 101.0)
+    assert entry["next_check_at"] == 103.0
+
+    # Terminal states are never polled again and move to the archive
+    pm.record_order_status("0000", "ord1", {"state": "filled"}, 103.0)
+    assert pm.order_refresh_due(entry, 1e9) is False
+    assert "ord1" not in pm.get_tracked_order_ids("0000")
+    assert pm.get_archived_orders("0000")["ord1"]["state"] == "filled"
+
+
+def test_enabled_trailing_stop_index(monkeypatch):
+    _mock_market_price(monkeypatch, 3.00)
+    pm = pm_mod.PositionManager()
+    lp = LongPosition(
+        symbol="IDX",
+        strike_price=50.0,
+        option_type="put",
+        expiration_date="2099-01-01",
+        quantity=1,
+        open_premium=100.0,
+        option_ids=["ghi"]
+    )
+    pm._store_positions("0000", {"IDX_2099-01-01_50.0_put": lp})
+    assert pm.has_enabled_trailing_stops("0000") is False
+
+    assert pm.enable_trailing_stop("0000", "IDX", 10.0) is True
+    assert pm.has_enabled_trailing_stops("0000") is True
+
+    assert pm.disable_trailing_stop("0000", "IDX") is lp
+    assert lp.trail_stop_data.enabled is False
+    assert pm.has_enabled_trailing_stops("0000") is False
+
+
+def test_risk_manager_follows_position_reload(monkeypatch):
+    _mock_market_price(monkeypatch, 2.00)
+    pm = pm_mod.position_manager
+    key = "RLD_2099-01-01_10.0_call"
+
+    def _position():
+        return LongPosition(
+            symbol="RLD",
+            strike_price=10.0,
+            option_type="call",
+            expiration_date="2099-01-01",
+            quantity=1,
+            open_premium=100.0,
+            option_ids=["rld"]
+        )
+
+    with pm._lock:
+        pm._store_positions("0001", {key: _position()})
+    brm = BaseRiskManager(account_number="0001")
+    assert brm.load_long_positions() == 1
+
+    # A dashboard visit reloads the account, swapping in new position objects
+    with pm._lock:
+        pm._store_positions("0001", {key: _position()})
+    _mock_market_price(monkeypatch, 5.00)
+    brm.update_position_prices()
+
+    # The rows the dashboard builds must see the monitor's refresh
+    assert brm.positions[key].current_price == 5.00
+    assert brm.position_at(0)[1].current_price == 5.00
+    assert brm.total_pnl() == 400.0
+
+
+def test_refresh_prices_fetches_quotes_without_lock(monkeypatch):
+    pm = pm_mod.PositionManager()
+    lock_free_during_fetch = []
+
+    def _get_option_market_data_by_id(_):
+        # Another thread (a positions request) must be able to take the lock mid-fetch
+        def probe():
+            acquired = pm._lock.acquire(blocking=False)
+            lock_free_during_fetch.append(acquired)
+            if acquired:
+                pm._lock.release()
+        t = threading.Thread(target=probe)
+        t.start()
+        t.join()
+        return [{"adjusted_mark_price": "4.00"}]
+
+    monkeypatch.setattr(pm_mod.r, "get_option_market_data_by_id", _get_option_market_data_by_id)
+    lp = LongPosition(
+        symbol="LCK",
+        strike_price=10.0,
+        option_type="call",
+        expiration_date="2099-01-01",
+        quantity=1,
+        open_premium=100.0,
+        option_ids=["lck"]
+    )
+    pm._store_positions("0000", {"LCK_2099-01-01_10.0_call": lp})
+    pm.refresh_prices("0000")
+
+    assert lock_free_during_fetch == [True]
+    assert lp.current_price == 4.00
+    assert pm.get_total_pnl("0000") == 300.0
+
+
+def test_tracked_orders_persist_across_restart(tmp_path):
+    path = str(tmp_path / "orders.json")
+    pm = pm_mod.PositionManager()
+    assert pm.enable_order_persistence(path) == 0
+    pm._ensure_order_store("0000")
+    pm._tracked_orders["0000"]["ord1"] = {"symbol": "TEST", "order_type": "limit"}
+    pm.record_order_status("0000", "ord1", {"state": "confirmed"}, 100.0)
+
+    # A fresh manager restores the order and polls it again immediately
+    restored = pm_mod.PositionManager()
+    assert restored.enable_order_persistence(path) == 1
+    entry = restored.get_tracked_order_ids("0000")["ord1"]
+    assert entry["state"] == "confirmed"
+    assert "details" not in entry  # Only the compact fields are written
+    assert restored.order_refresh_due(entry, 0.0) is True
+
+
+def test_recent_close_order_detects_duplicates():
+    class FakeOrderService:
+        def submit_close_batch(self, positions, limit_prices):
+            return [{"success": True, "order_id": f"o{i}"} for i in range(len(positions))]
+
+        def cancel_orders(self, order_ids):
+            return {order_id: {"success": True} for order_id in order_ids}
+
+    pm = pm_mod.PositionManager()
+    pm.set_order_service(FakeOrderService())
+    lp = LongPosition(
+        symbol="DUP",
+        strike_price=10.0,
+        option_type="call",
+        expiration_date="2099-01-01",
+        quantity=1,
+        open_premium=100.0,
+        option_ids=["jkl"]
+    )
+    assert pm.recent_close_order("0000", "DUP_key") is None
+    pm.submit_close_orders("0000", [lp], [1.0], ["DUP_key"])
+    assert pm.recent_close_order("0000", "DUP_key") == "o0"
+    assert pm.recent_close_order("0000", "DUP_key", window=0.0) is None
+    assert pm.recent_close_order("0000", "OTHER_key") is None
+
+    # A cancelled close no longer blocks resubmitting the position
+    pm.cancel_orders(["o0"])
+    assert pm.recent_close_order("0000", "DUP_key") is None
+
+
+def test_dashboard_poll_wakes_idle_off_hours_monitor():
+    from multi_account_manager import AccountMonitoringThread
+
+    monitor = AccountMonitoringThread("00001234", {"display_name": "Test"})
+    monitor.note_viewed()
+    assert monitor.wake_event.is_set()  # First view after idling refreshes at once
+
+    monitor.wake_event.clear()
+    monitor.note_viewed()
+    assert not monitor.wake_event.is_set()  # Steady polling leaves the 60s cadence alone
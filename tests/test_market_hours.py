@@ -0,0 +1,22 @@
+import os, sys
+import datetime
+
+# Ensure repo root on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared.market_hours import is_market_hours, _ET
+
+
+def _ts(*args):
+    return _ET.localize(datetime.datetime(*args)).timestamp()
+
+
+def test_is_market_hours_session_bounds():
+    # Wednesday 2024-07-10 (EDT) and a Wednesday in EST, crossing cached days
+    assert is_market_hours(_ts(2024, 7, 10, 9, 29, 59)) is False
+    assert is_market_hours(_ts(2024, 7, 10, 9, 30)) is True
+    assert is_market_hours(_ts(2024, 7, 10, 16, 0)) is True
+    assert is_market_hours(_ts(2024, 7, 10, 16, 0, 1)) is False
+    assert is_market_hours(_ts(2024, 1, 10, 12, 0)) is True
+    # Saturday
+    assert is_market_hours(_ts(2024, 7, 13, 12, 0)) is False
@@ -0,0 +1,210 @@
+import json
+import os, sys
+import threading
+from collections import OrderedDict
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+# Ensure repo root on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import shared.order_service as os_mod
+
+
+def test_get_orders_info_batches_and_falls_back(monkeypatch):
+    calls = {"page": 0, "single": []}
+
+    def fake_request_get(url, dataType="regular"):
+        calls["page"] += 1
+        return {"results": [{"id": "a", "state": "filled"}, {"id": "zzz", "state": "queued"}]}
+
+    def fake_get_option_order_info(order_id):
+        calls["single"].append(order_id)
+        return {"id": order_id, "state": "confirmed"}
+
+    monkeypatch.setattr(os_mod.helper, "request_get", fake_request_get)
+    monkeypatch.setattr(os_mod.r, "get_option_order_info", fake_get_option_order_info)
+
+    svc = os_mod.OrderService(rm_logger=None)
+    resp = svc.get_orders_info(["a", "b"])
+
+    assert resp["success"] is True
+    assert resp["details"]["a"]["state"] == "filled"
+    assert resp["details"]["b"]["state"] == "confirmed"
+    # One page request, per-id request only for the order missing from the page
+    assert calls["page"] == 1
+    assert calls["single"] == ["b"]
+
+
+def test_get_orders_info_page_failure_falls_back_per_id(monkeypatch):
+    def failing_request_get(url, dataType="regular"):
+        raise ConnectionError("page down")
+
+    def fake_get_option_order_info(order_id):
+        if order_id == "bad":
+            raise ConnectionError("id down")
+        return {"id": order_id, "state": "confirmed"}
+
+    monkeypatch.setattr(os_mod.helper, "request_get", failing_request_get)
+    monkeypatch.setattr(os_mod.r, "get_option_order_info", fake_get_option_order_info)
+
+    svc = os_mod.OrderService(rm_logger=None)
+    resp = svc.get_orders_info(["a", "b", "bad"])
+
+    # Each order succeeds or fails on its own
+    assert resp["success"] is True
+    assert set(resp["details"]) == {"a", "b"}
+
+
+class _NullLogger:
+    def log_real_order(self, **kwargs):
+        pass
+
+
+def _mount_orders_adapter(monkeypatch, respond):
+    """Route the shared session's option-order POSTs to respond(request, payload) -> body dict."""
+    class _FakeAdapter(BaseAdapter):
+        def send(self, request, **kwargs):
+            resp = Response()
+            resp.status_code = 201
+            resp._content = json.dumps(respond(request, json.loads(request.body))).encode()
+            resp.request = request
+            return resp
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(os_mod.SESSION, "adapters", OrderedDict(os_mod.SESSION.adapters))
+    os_mod.SESSION.mount(os_mod.option_orders_url(), _FakeAdapter())
+
+
+class P:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.quantity = 1
+        self.expiration_date = "2099-01-01"
+        self.strike_price = 10.0
+        self.option_type = "call"
+        self.option_ids = [f"opt-{symbol}"]
+
+
+def test_submit_close_batch_preserves_order(monkeypatch):
+    def respond(request, payload):
+        if payload["legs"][0]["option"].endswith("/opt-BAD/"):
+            return {"detail": "rejected"}
+        return {"id": f"id-{payload['legs'][0]['option'].rsplit('-', 1)[1].strip('/')}"}
+
+    _mount_orders_adapter(monkeypatch, respond)
+    monkeypatch.setattr(os_mod.r, "load_account_profile", lambda info=None: "https://api/accounts/1/")
+
+    svc = os_mod.OrderService(rm_logger=_NullLogger())
+    results = svc.submit_close_batch([P("A"), P("BAD"), P("C")], [1.0, 2.0, 3.0])
+
+    assert [r["success"] for r in results] == [True, False, True]
+    assert results[0]["order_id"] == "id-A"
+    assert results[2]["order_id"] == "id-C"
+
+
+def test_submit_close_posts_payload_with_cached_lookups(monkeypatch):
+    posts = []
+    profile_calls = []
+
+    def respond(request, payload):
+        posts.append(payload)
+        return {"id": f"o{len(posts)}"}
+
+    def fake_load_account_profile(info=None):
+        profile_calls.append(info)
+        return "https://api/accounts/1/"
+
+    _mount_orders_adapter(monkeypatch, respond)
+    monkeypatch.setattr(os_mod.r, "load_account_profile", fake_load_account_profile)
+
+    svc = os_mod.OrderService(rm_logger=_NullLogger())
+    assert svc.submit_close(P("A"), 1.234)["order_id"] == "o1"
+    assert svc.submit_trailing_stop(P("A"), 1.0, 1.031)["order_id"] == "o2"
+
+    limit, stop = posts
+    assert limit["legs"][0]["option"] == "https://api.robinhood.com/options/instruments/opt-A/"
+    assert (limit["trigger"], limit["price"], limit["direction"]) == ("immediate", 1.23, "credit")
+    assert (stop["trigger"], stop["price"], stop["stop_price"]) == ("stop", 1.0, 1.03)
+    assert limit["ref_id"] != stop["ref_id"]
+    assert profile_calls == ["url"]  # Account URL looked up once
+
+
+def test_concurrent_close_orders_always_send_json_content_type(monkeypatch):
+    content_types = []
+
+    def respond(request, payload):
+        content_types.append(request.headers.get("Content-Type"))
+        return {"id": payload["ref_id"]}
+
+    _mount_orders_adapter(monkeypatch, respond)
+    monkeypatch.setattr(os_mod.r, "load_account_profile", lambda info=None: "https://api/accounts/1/")
+    monkeypatch.setitem(os_mod.SESSION.headers, "Content-Type", "application/x-www-form-urlencoded; charset=utf-8")
+
+    # Another thread flipping the shared header, as helper.request_post(json=True) does
+    stop = threading.Event()
+
+    def flip():
+        while not stop.is_set():
+            os_mod.helper.update_session("Content-Type", "application/json")
+            os_mod.helper.update_session("Content-Type", "application/x-www-form-urlencoded; charset=utf-8")
+
+    flipper = threading.Thread(target=flip)
+    flipper.start()
+    try:
+        svc = os_mod.OrderService(rm_logger=_NullLogger())
+        positions = [P(f"S{i}") for i in range(200)]
+        results = svc.submit_close_batch(positions, [1.0] * len(positions))
+    finally:
+        stop.set()
+        flipper.join()
+
+    assert all(r["success"] for r in results)
+    assert len(content_types) == 200
+    assert set(content_types) == {"application/json"}
+
+
+def test_list_open_orders_reuses_recent_fetch(monkeypatch):
+    calls = {"page": 0}
+
+    def fake_request_get(url, dataType="regular"):
+        calls["page"] += 1
+        return {"results": [{"id": "a", "state": "queued"}, {"id": "b", "state": "filled"}], "next": None}
+
+    monkeypatch.setattr(os_mod.helper, "request_get", fake_request_get)
+    monkeypatch.setattr(os_mod.r, "cancel_option_order", lambda order_id: None)
+
+    svc = os_mod.OrderService(rm_logger=None)
+    first = svc.list_open_orders()
+    second = svc.list_open_orders()
+    assert [o["id"] for o in first["orders"]] == ["a"]
+    assert second["orders"] == first["orders"]
+    assert calls["page"] == 1
+
+    # Cancelling changes the order book, so the next listing refetches
+    svc.cancel_order("a")
+    svc.list_open_orders()
+    assert calls["page"] == 2
+
+
+def test_cancel_orders_fans_out_and_dedupes(monkeypatch):
+    cancelled = []
+
+    def fake_cancel_option_order(order_id):
+        cancelled.append(order_id)
+        if order_id == "bad":
+            raise RuntimeError("not cancellable")
+        return None
+
+    monkeypatch.setattr(os_mod.r, "cancel_option_order", fake_cancel_option_order)
+
+    svc = os_mod.OrderService(rm_logger=None)
+    results = svc.cancel_orders(["a", "bad", "a", "c"])
+
+    assert list(results) == ["a", "bad", "c"]
+    assert results["a"]["success"] is True
+    assert results["bad"]["success"] is False
+    assert sorted(cancelled) == ["a", "bad", "c"]
@@ -0,0 +1,112 @@
+import datetime
+import os, sys
+import types
+
+import pytest
+
+# Ensure repo root on path for module imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from position_types import LongPosition
+import position_manager as pm_mod
+from base_risk_manager import BaseRiskManager
+import risk_manager_web as web
+
+ACCOUNT = "AAAA00005678"
+KEY = "WEB_2099-01-01_10.0_call"
+
+
+class _FakeDetector:
+    def get_account_info(self, account_prefix):
+        return {"number": ACCOUNT}
+
+
+class _FakeMultiAccountManager:
+    def __init__(self, risk_manager):
+        self.risk_manager = risk_manager
+
+    def ensure_account_monitoring(self, account_number):
+        return self.risk_manager
+
+    def get_account_risk_manager(self, account_number):
+        return self.risk_manager
+
+    def note_dashboard_poll(self, account_number):
+        pass
+
+    def wake_account_monitoring(self, account_number):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pm_mod.r, "get_option_market_data_by_id", lambda _id: [{"adjusted_mark_price": "2.50"}])
+    lp = LongPosition(
+        symbol="WEB",
+        strike_price=10.0,
+        option_type="call",
+        expiration_date="2099-01-01",
+        quantity=1,
+        open_premium=100.0,
+        option_ids=["web"]
+    )
+    with pm_mod.position_manager._lock:
+        pm_mod.position_manager._store_positions(ACCOUNT, {KEY: lp})
+    risk_manager = BaseRiskManager(account_number=ACCOUNT)
+    risk_manager.load_long_positions()
+
+    monkeypatch.setattr(web, "account_detector", _FakeDetector())
+    monkeypatch.setattr(web, "multi_account_manager", _FakeMultiAccountManager(risk_manager))
+    web._invalidate_positions_cache(ACCOUNT)
+    yield web.app.test_client()
+    web._invalidate_positions_cache(ACCOUNT)
+
+
+def test_positions_etag_revalidates_and_changes_on_config(client):
+    url = "/api/account/STD-5678/positions"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    # Unchanged state: the client's copy is still valid
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+
+    # Enabling a trailing stop invalidates the cached payload right away (within the cache TTL)
+    # (the stop-limit order itself needs --live; the trail is enabled before that check)
+    client.post("/api/account/STD-5678/trailing-stop", json={"symbol": "WEB", "enabled": True, "percent": 20})
+    after_trail = client.get(url, headers={"If-None-Match": etag})
+    assert after_trail.status_code == 200
+    assert after_trail.get_json()["positions"][0]["trail_stop"]["enabled"] is True
+    trail_etag = after_trail.headers["ETag"]
+    assert trail_etag != etag
+
+    # Same for take profit
+    resp = client.post("/api/account/STD-5678/take-profit", json={"symbol": "WEB", "enabled": True, "percent": 50})
+    assert resp.get_json()["success"] is True
+    after_tp = client.get(url, headers={"If-None-Match": trail_etag})
+    assert after_tp.status_code == 200
+    assert after_tp.headers["ETag"] != trail_etag
+
+
+def test_positions_cache_hit_gets_fresh_last_update(client, monkeypatch):
+    builds = []
+    compute = web._compute_positions_payload
+
+    def counting_compute(risk_manager, account_number=None):
+        builds.append(account_number)
+        return compute(risk_manager, account_number)
+
+    times = iter([datetime.datetime(2099, 1, 1, 10, 0, 0), datetime.datetime(2099, 1, 1, 10, 0, 1)])
+    fake_datetime = types.SimpleNamespace(datetime=types.SimpleNamespace(now=lambda: next(times)))
+    monkeypatch.setattr(web, "_compute_positions_payload", counting_compute)
+    monkeypatch.setattr(web, "datetime", fake_datetime)
+
+    url = "/api/account/STD-5678/positions"
+    first = client.get(url).get_json()
+    second = client.get(url).get_json()
+
+    assert len(builds) == 1  # Second poll within the TTL is served from the cache
+    assert first["positions"] == second["positions"]
+    assert (first["last_update"], second["last_update"]) == ("10:00:00", "10:00:01")